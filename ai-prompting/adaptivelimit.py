@@ -0,0 +1,76 @@
+########################################################################################################################
+# Adaptive Concurrency Limiter                                                                                         #
+#                                                                                                                      #
+# This module caps the number of requests an asyncio program has in flight, and adapts that cap to the rate limits    #
+# of the server: a rate-limited response halves the cap and pauses every request for the server's Retry-After delay,  #
+# and each success grows the cap back by about one request per round trip, up to the configured ceiling.              #
+########################################################################################################################
+
+import asyncio
+import time
+
+
+class AdaptiveLimiter:
+    def __init__(self, ceiling: int, floor: int = 1):
+        """
+        Create a limiter allowing `ceiling` requests in flight.
+
+        Parameters:
+        ceiling (int): The maximum number of concurrent requests.
+        floor (int): The number of concurrent requests rate limits never go below (default is 1).
+
+        Usage:
+        async with limiter:
+            response = await send(request)
+        """
+        self.ceiling = ceiling
+        self.floor = min(floor, ceiling)
+        self.limit = float(ceiling)
+        self.active = 0
+        self.paused_until = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            async with self._condition:
+                if self.paused_until > time.monotonic():
+                    continue
+                if self.active < int(self.limit):
+                    self.active += 1
+                    return
+                await self._condition.wait()
+
+    async def release(self, success: bool = True):
+        async with self._condition:
+            self.active -= 1
+            if success:
+                # Additive increase: about +1 once every request in flight has succeeded.
+                self.limit = min(self.ceiling, self.limit + 1 / self.limit)
+            self._condition.notify(max(1, int(self.limit) - self.active))
+
+    def throttle(self, delay: float):
+        """
+        Record a rate-limited response: halve the concurrency and hold every request for `delay` seconds.
+
+        Parameters:
+        delay (float): The seconds to wait, usually the server's Retry-After.
+
+        Returns:
+        None
+        """
+        now = time.monotonic()
+        # Concurrent rejections of the same burst only halve the limit once.
+        if now >= self.paused_until:
+            self.limit = max(self.floor, self.limit / 2)
+        self.paused_until = max(self.paused_until, now + delay)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.release(success=exc_type is None)
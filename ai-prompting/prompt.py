@@ -1,38 +1,280 @@
+import argparse
+import asyncio
+import json
 import os
+import random
+import sys
+import threading
 import openai
 from dotenv import load_dotenv
 import time
 
+from adaptivelimit import AdaptiveLimiter
+from responsecache import ResponseCache
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Set OpenAI API key from environment variable
+# (OPENAI_API_BASE points the client at another server, e.g. a local stub in tests)
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+MODEL = "gpt-3.5-turbo"
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+# Retries of a request that was rate limited or failed on the server side, and the per-request timeout
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 5))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", 60))
+RETRYABLE_ERRORS = (openai.error.RateLimitError, openai.error.ServiceUnavailableError,
+                    openai.error.APIConnectionError, openai.error.Timeout)
+
+# Response cache settings; set PROMPT_CACHE_PATH to an empty value to disable the cache.
+PROMPT_CACHE_PATH = os.getenv("PROMPT_CACHE_PATH", "prompt-cache.db")
+PROMPT_CACHE_MAX_MB = float(os.getenv("PROMPT_CACHE_MAX_MB", 64))
+PROMPT_CACHE_TTL = float(os.getenv("PROMPT_CACHE_TTL")) if os.getenv("PROMPT_CACHE_TTL") else None
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    # Opened on first use, and shared by every call (and thread) so identical requests are coalesced.
+    global _cache
+    with _cache_lock:
+        if _cache is None and PROMPT_CACHE_PATH:
+            _cache = ResponseCache(PROMPT_CACHE_PATH, int(PROMPT_CACHE_MAX_MB * 1024 * 1024), PROMPT_CACHE_TTL)
+    return _cache
+
+
+def build_messages(prompt: str) -> list:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def retry_delay(error, attempt: int, backoff: float = 1.0, max_backoff: float = 60.0) -> float:
+    """
+    Compute how long to wait before retrying a failed request.
+
+    Parameters:
+    error (Exception): The error of the failed attempt; its Retry-After header is used when present.
+    attempt (int): The number of the failed attempt, starting at 0.
+    backoff (float): The base delay in seconds, doubled on each attempt (default is 1).
+    max_backoff (float): The longest delay in seconds (default is 60).
+
+    Returns:
+    float: The delay in seconds.
+    """
+    headers = getattr(error, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    delay = min(max_backoff, backoff * 2 ** attempt)
+    # Jitter keeps concurrent clients from retrying in lockstep.
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def create_completion(prompt: str, max_tokens: int = 100, max_retries: int = MAX_RETRIES) -> str:
+    for attempt in range(max_retries + 1):
+        try:
+            response = openai.ChatCompletion.create(
+                model=MODEL,
+                messages=build_messages(prompt),
+                max_tokens=max_tokens,
+                request_timeout=REQUEST_TIMEOUT
+            )
+            # Extract and return the assistant's reply
+            return response['choices'][0]['message']['content']
+
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"{type(e).__name__}: retrying in {delay:.1f} s ({attempt + 1}/{max_retries})...")
+            time.sleep(delay)
+
+
+async def acreate_completion(prompt: str, max_tokens: int, limiter: AdaptiveLimiter,
+                             max_retries: int = MAX_RETRIES) -> str:
+    for attempt in range(max_retries + 1):
+        try:
+            async with limiter:
+                response = await openai.ChatCompletion.acreate(
+                    model=MODEL,
+                    messages=build_messages(prompt),
+                    max_tokens=max_tokens,
+                    request_timeout=REQUEST_TIMEOUT
+                )
+            return response['choices'][0]['message']['content']
+
+        except RETRYABLE_ERRORS as e:
+            if attempt == max_retries:
+                raise
+            delay = retry_delay(e, attempt)
+            if isinstance(e, openai.error.RateLimitError):
+                # Slow the whole batch down, not just this request.
+                limiter.throttle(delay)
+            else:
+                await asyncio.sleep(delay)
 
-def prompt_chatgpt(prompt: str, max_tokens: int = 100) -> str:
+
+def prompt_chatgpt(prompt: str, max_tokens: int = 100, use_cache: bool = True, max_retries: int = MAX_RETRIES) -> str:
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens
-        )
-        # Extract and return the assistant's reply
-        return response['choices'][0]['message']['content']
-
-    except openai.error.RateLimitError:
-        print("Rate limit exceeded. Waiting before retrying...")
-        time.sleep(30)
-        return prompt_chatgpt(prompt, max_tokens)
+        cache = get_cache() if use_cache else None
+        if cache is None:
+            return create_completion(prompt, max_tokens, max_retries)
+        key = ResponseCache.key(MODEL, SYSTEM_PROMPT, prompt, max_tokens)
+        return cache.get_or_compute(key, create_completion, prompt, max_tokens, max_retries)
+
     except Exception as e:
         print(f"An error occurred: {e}")
         return ""
 
 
+async def prompt_chatgpt_stream(prompts, max_tokens: int = 100, concurrency: int = 8,
+                                max_retries: int = MAX_RETRIES, use_cache: bool = True):
+    """
+    Send many prompts concurrently and yield each answer as soon as it arrives.
+
+    At most `concurrency` requests are in flight; rate-limited responses lower that number
+    and pause the batch for the server's Retry-After delay, and it grows back on success.
+    Identical prompts of the batch share a single request, and cached answers skip the API.
+
+    Parameters:
+    prompts (iterable): The prompts; read lazily, so it may be a generator.
+    max_tokens (int): The maximum length of each reply (default is 100).
+    concurrency (int): The maximum number of requests in flight (default is 8).
+    max_retries (int): The retries of a failing request before giving up on it (default is MAX_RETRIES).
+    use_cache (bool): Read and fill the response cache (default is True).
+
+    Yields:
+    tuple: (index, response, error) in completion order, where index is the position of the prompt;
+           on failure the response is "" and error holds the message, otherwise error is None.
+    """
+    # aiohttp comes with openai; imported here so single prompts do not pay for it.
+    import aiohttp
+
+    cache = get_cache() if use_cache else None
+    limiter = AdaptiveLimiter(concurrency)
+    in_flight = {}
+
+    async def complete(key, prompt):
+        response = cache.get(key)
+        if response is None:
+            start = time.perf_counter()
+            response = await acreate_completion(prompt, max_tokens, limiter, max_retries)
+            cache.put(key, response, time.perf_counter() - start)
+        return response
+
+    async def answer(index, prompt):
+        try:
+            if cache is None:
+                return index, await acreate_completion(prompt, max_tokens, limiter, max_retries), None
+            key = ResponseCache.key(MODEL, SYSTEM_PROMPT, prompt, max_tokens)
+            task = in_flight.get(key)
+            if task is None:
+                task = in_flight[key] = asyncio.ensure_future(complete(key, prompt))
+                task.add_done_callback(lambda _: in_flight.pop(key, None))
+            return index, await asyncio.shield(task), None
+        except Exception as e:
+            return index, "", str(e) or type(e).__name__
+
+    # Only a window of prompts is scheduled at a time, so long batches stay in constant memory.
+    window = concurrency * 2
+    items = enumerate(prompts)
+    pending = set()
+    async with aiohttp.ClientSession() as session:
+        token = openai.aiosession.set(session)
+        try:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < window:
+                    item = next(items, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        pending.add(asyncio.ensure_future(answer(*item)))
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            openai.aiosession.reset(token)
+
+
+def prompt_chatgpt_batch(prompts, max_tokens: int = 100, concurrency: int = 8,
+                         max_retries: int = MAX_RETRIES, use_cache: bool = True) -> list:
+    """
+    Send many prompts concurrently and return the answers in the order of the prompts.
+
+    Parameters:
+    prompts (iterable): The prompts.
+    max_tokens (int): The maximum length of each reply (default is 100).
+    concurrency (int): The maximum number of requests in flight (default is 8).
+    max_retries (int): The retries of a failing request before giving up on it (default is MAX_RETRIES).
+    use_cache (bool): Read and fill the response cache (default is True).
+
+    Returns:
+    list: The responses, "" for the prompts that failed.
+    """
+    async def collect():
+        responses = {}
+        async for index, response, error in prompt_chatgpt_stream(prompts, max_tokens, concurrency,
+                                                                  max_retries, use_cache):
+            if error:
+                print(f"An error occurred for prompt {index}: {error}")
+            responses[index] = response
+        return [responses[index] for index in range(len(responses))]
+
+    return asyncio.run(collect())
+
+
+async def stream_to_jsonl(prompts, output, **options):
+    async for index, response, error in prompt_chatgpt_stream(prompts, **options):
+        output.write(json.dumps({"index": index, "prompt": prompts[index], "response": response,
+                                 "error": error}) + "\n")
+        output.flush()
+
+
 if __name__ == "__main__":
-    user_prompt = input("Enter your prompt: ")
-    response = prompt_chatgpt(user_prompt)
-    print("ChatGPT Response:", response)
+    instrumentation.main_session()
+    parser = argparse.ArgumentParser(description="Prompt ChatGPT.")
+    parser.add_argument("prompt", nargs="?", help="The prompt (asked interactively when omitted).")
+    parser.add_argument("--batch", help="A file with one prompt per line; answers are printed as JSON lines "
+                                        "in completion order.")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="The maximum number of requests in flight for --batch (default is 8).")
+    parser.add_argument("--max-retries", type=int, default=MAX_RETRIES,
+                        help=f"The retries of a failing request (default is {MAX_RETRIES}).")
+    parser.add_argument("--max-tokens", type=int, default=100, help="The maximum length of the reply (default is 100).")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API, bypassing the response cache.")
+    parser.add_argument("--cache-stats", action="store_true", help="Print the response cache statistics.")
+    args = parser.parse_args()
+
+    if args.batch:
+        with open(args.batch, encoding="utf-8") as f:
+            batch = [line.rstrip("\n") for line in f if line.strip()]
+        asyncio.run(stream_to_jsonl(batch, sys.stdout, max_tokens=args.max_tokens,
+                                    concurrency=args.concurrency, max_retries=args.max_retries,
+                                    use_cache=not args.no_cache))
+    else:
+        user_prompt = args.prompt or input("Enter your prompt: ")
+        response = prompt_chatgpt(user_prompt, args.max_tokens, not args.no_cache, args.max_retries)
+        print("ChatGPT Response:", response)
+
+    if args.cache_stats and get_cache() is not None:
+        stats = get_cache().stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses, {stats['coalesced']} coalesced; "
+              f"{stats['lifetime_hits']} API calls and {stats['lifetime_saved_seconds']:.1f} s saved overall")
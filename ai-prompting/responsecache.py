@@ -0,0 +1,254 @@
+########################################################################################################################
+# Response Cache                                                                                                       #
+#                                                                                                                      #
+# This module keeps model responses in a local SQLite database, keyed by a hash of the request (model, messages,       #
+# max_tokens), so that repeated prompts are answered without calling the API again. The cache is bounded in size      #
+# (least recently used entries are evicted first) and entries can expire after a time to live. Identical requests     #
+# made at the same time by several threads are coalesced: only one of them calls the API, the others wait for its     #
+# answer. Hit/miss counters, and the API calls and seconds saved, are kept per session and over the cache's lifetime. #
+#                                                                                                                      #
+# Usage: python responsecache.py <cache.db> [--clear]                                                                  #
+########################################################################################################################
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    elapsed REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+# Once over the size limit, evict down to this fraction of it so eviction does not run on every insert.
+EVICTION_LOW_WATER = 0.9
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache:
+    def __init__(self, path: str = "prompt-cache.db", max_bytes: int = 64 * 1024 * 1024, ttl: float = None):
+        """
+        Open (and create if needed) the response cache.
+
+        Parameters:
+        path (str): The SQLite database file (default is "prompt-cache.db").
+        max_bytes (int): The total size of the cached responses before the least recently used
+                         are evicted (default is 64 MB).
+        ttl (float): Seconds after which a response is stale and requested again (optional, never by default).
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._counters = {"hits": 0, "misses": 0, "coalesced": 0, "expired": 0, "evicted": 0, "saved_seconds": 0.0}
+        connection = self._connection()
+        connection.executescript(SCHEMA)
+        self._bytes = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Build the cache key of a request.
+
+        Parameters:
+        *parts: The JSON-serializable values identifying the request, e.g. model, messages and max_tokens.
+
+        Returns:
+        str: A SHA-256 hex digest of the values.
+        """
+        encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """
+        Look a response up, refreshing its position in the LRU order.
+
+        Parameters:
+        key (str): The request key (see `ResponseCache.key`).
+
+        Returns:
+        str: The cached response, or None on a miss or when it expired.
+        """
+        connection = self._connection()
+        row = connection.execute("SELECT response, elapsed, created_at FROM responses WHERE key = ?",
+                                 (key,)).fetchone()
+        now = time.time()
+        if row and self.ttl is not None and row[2] < now - self.ttl:
+            self._delete(connection, key)
+            self._count(expired=1)
+            row = None
+        if row is None:
+            self._count(misses=1)
+            return None
+
+        connection.execute("UPDATE responses SET hits = hits + 1, accessed_at = ? WHERE key = ?", (now, key))
+        self._count(hits=1, saved_seconds=row[1])
+        return row[0]
+
+    def put(self, key: str, response: str, elapsed: float = 0.0):
+        """
+        Store a response, evicting the least recently used ones if the cache grows over its size limit.
+
+        Parameters:
+        key (str): The request key (see `ResponseCache.key`).
+        response (str): The response to cache.
+        elapsed (float): The seconds the request took, counted as saved on each later hit (default is 0).
+
+        Returns:
+        None
+        """
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        connection = self._connection()
+        previous = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        connection.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, elapsed, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)", (key, response, size, elapsed, now, now))
+        with self._lock:
+            self._bytes += size - (previous[0] if previous else 0)
+            over_limit = self._bytes > self.max_bytes
+        if over_limit:
+            self._evict(connection)
+
+    def get_or_compute(self, key: str, compute, *args, **kwargs):
+        """
+        Return the cached response of a request, or compute and cache it.
+
+        If the same key is already being computed by another thread, wait for that result
+        instead of computing it a second time.
+
+        Parameters:
+        key (str): The request key (see `ResponseCache.key`).
+        compute (callable): Called with `*args` and `**kwargs` on a miss; must return a string
+                            and raise on failure (failures are not cached).
+
+        Returns:
+        str: The response.
+        """
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = self._in_flight[key] = _InFlight()
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            in_flight.done.wait()
+            if in_flight.error is not None:
+                raise in_flight.error
+            return in_flight.value
+
+        try:
+            value = self.get(key)
+            if value is None:
+                start = time.perf_counter()
+                value = compute(*args, **kwargs)
+                self.put(key, value, time.perf_counter() - start)
+            in_flight.value = value
+            return value
+        except BaseException as error:
+            in_flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            in_flight.done.set()
+
+    def stats(self) -> dict:
+        """
+        Report the cache usage.
+
+        Returns:
+        dict: The session counters (hits, misses, coalesced, expired, evicted, saved_seconds, hit_rate)
+              and the lifetime totals of the database (entries, bytes, lifetime_hits, lifetime_saved_seconds).
+        """
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        entries, size, hits, saved = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * elapsed), 0) "
+            "FROM responses").fetchone()
+        stats.update(entries=entries, bytes=size, lifetime_hits=hits, lifetime_saved_seconds=saved)
+        return stats
+
+    def clear(self):
+        self._connection().execute("DELETE FROM responses")
+        with self._lock:
+            self._bytes = 0
+
+    def _evict(self, connection):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            # Other processes may share the file: start from the real total.
+            total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            target = self.max_bytes * EVICTION_LOW_WATER
+            evicted = 0
+            for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                if total <= target:
+                    break
+                connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                evicted += 1
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self._bytes = total
+            self._counters["evicted"] += evicted
+
+    def _delete(self, connection, key):
+        row = connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+        if row:
+            with self._lock:
+                self._bytes -= row[0]
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; eviction uses an explicit transaction.
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a prompt response cache.")
+    parser.add_argument("path", help="The cache database.")
+    parser.add_argument("--clear", action="store_true", help="Remove every cached response.")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.path)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['entries']} responses cached ({stats['bytes'] / 1024:.1f} KB)")
+    print(f"{stats['lifetime_hits']} API calls saved, {stats['lifetime_saved_seconds']:.1f} s of latency saved")
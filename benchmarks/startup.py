@@ -0,0 +1,84 @@
+########################################################################################################################
+# Startup Time Benchmark                                                                                               #
+#                                                                                                                      #
+# This script measures the cold start of the `boring-tasks` entry point and the import time of each command's script, #
+# each in a fresh interpreter, and fails when the entry point is slower than the target. Commands whose dependencies  #
+# are not installed are reported and skipped.                                                                          #
+#                                                                                                                      #
+# Usage: python benchmarks/startup.py [--runs 5] [--target-ms 100]                                                     #
+########################################################################################################################
+
+import argparse
+import importlib.util
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINT = os.path.join(ROOT, "boring-tasks.py")
+
+# Loads a script without running its `__main__` block, so the measure is pure import time.
+IMPORT_SNIPPET = (
+    "import runpy, sys, os; script = sys.argv[1]; "
+    "sys.path.insert(0, os.path.dirname(script)); runpy.run_path(script, run_name='startup_benchmark')"
+)
+
+
+def load_commands():
+    spec = importlib.util.spec_from_file_location("boring_tasks", ENTRY_POINT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.COMMANDS, module.script_path
+
+
+def measure(command_line, runs):
+    """
+    Run a command line several times in fresh interpreters.
+
+    Parameters:
+    command_line (list): The command to run.
+    runs (int): The number of runs.
+
+    Returns:
+    tuple: The median wall time in milliseconds, and the error output of a failed run (or None).
+    """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command_line, cwd=ROOT, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"
+    return statistics.median(timings), None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the startup time of the boring-tasks commands.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measure (default is 5).")
+    parser.add_argument("--target-ms", type=float, default=100.0,
+                        help="Maximum cold start of the entry point, in milliseconds (default is 100).")
+    args = parser.parse_args()
+
+    commands, script_path = load_commands()
+
+    interpreter, _ = measure([sys.executable, "-c", "pass"], args.runs)
+    entry_point, error = measure([sys.executable, ENTRY_POINT, "--help"], args.runs)
+    if error:
+        print(f"boring-tasks --help failed: {error}")
+        sys.exit(1)
+
+    print(f"{'interpreter':<16}{interpreter:>9.1f} ms")
+    print(f"{'boring-tasks':<16}{entry_point:>9.1f} ms (target {args.target_ms:.0f} ms)")
+    for command in commands:
+        elapsed, error = measure([sys.executable, "-c", IMPORT_SNIPPET, script_path(command)], args.runs)
+        if error:
+            print(f"{command:<16}{'skipped':>9}    ({error})")
+        else:
+            print(f"{command:<16}{elapsed:>9.1f} ms")
+
+    if entry_point > args.target_ms:
+        print(f"\nboring-tasks starts in {entry_point:.1f} ms, above the {args.target_ms:.0f} ms target.")
+        sys.exit(1)
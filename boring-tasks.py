@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+########################################################################################################################
+# Boring Tasks Command Line                                                                                            #
+#                                                                                                                      #
+# A single entry point for every script of the repository: `boring-tasks <command> [arguments]`.                      #
+# Only the script of the invoked command is loaded, so heavy dependencies (PyPDF2, docx, twilio, openai, bs4, ...)    #
+# and their side effects are paid for only by the commands that need them. Startup time is tracked by                 #
+# `benchmarks/startup.py`.                                                                                             #
+#                                                                                                                      #
+# Usage: python boring-tasks.py <command> [arguments]                                                                  #
+#        python boring-tasks.py <command> --help                                                                       #
+#        python boring-tasks.py [--metrics FILE] [--profile FILE] [--trace-memory] <command> [arguments]               #
+########################################################################################################################
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Command name -> (script path relative to the repository, description)
+COMMANDS = {
+    "move": ("file-transfert/move.py", "Move files from a source directory to a destination directory."),
+    "rename": ("rename-file.py", "Rename files in a directory."),
+    "wordcount": ("word-count/wordcounter.py", "Count words in a text, PDF or Word file."),
+    "email": ("communication-automation/email-automation.py", "Send emails or mail-merge a recipient list."),
+    "sms": ("communication-automation/sms-automation.py", "Send text messages."),
+    "outbox": ("communication-automation/outbox.py", "Inspect or drain a persistent email/SMS outbox."),
+    "extract": ("document-processing/field-extraction.py", "Extract categorized activities from Word documents."),
+    "activities": ("document-processing/activityindex.py", "Index and search the activities of Word reports."),
+    "prompt": ("ai-prompting/prompt.py", "Prompt ChatGPT."),
+    "download-books": ("pdf_downloads/pdfdownloader.py", "Search and download the PDFs listed in bookname.py."),
+    "scrape-pdfs": ("web-scapping/pdf-webscrapping.py", "Download the PDFs linked from a web page."),
+}
+
+
+def script_path(command):
+    return os.path.join(ROOT, COMMANDS[command][0])
+
+
+def run_command(command, arguments):
+    """
+    Run a command's script as if it was started directly, with the given arguments.
+
+    Parameters:
+    command (str): The command name.
+    arguments (list): The command line arguments of the script.
+
+    Returns:
+    None
+    """
+    # Imported here: listing the commands does not need it.
+    import runpy
+
+    script = script_path(command)
+    # Scripts import their sibling modules, as when run from their own folder, and the shared modules
+    # (instrumentation, watcher) of the repository root.
+    sys.path[:0] = [os.path.dirname(script), ROOT]
+    sys.argv = [script, *arguments]
+    runpy.run_path(script, run_name="__main__")
+
+
+def print_usage(stream=sys.stdout):
+    stream.write("usage: boring-tasks [--metrics FILE] [--profile FILE] [--trace-memory] <command> [arguments]\n\n"
+                 "commands:\n")
+    width = max(len(command) for command in COMMANDS)
+    for command, (_, description) in COMMANDS.items():
+        stream.write(f"  {command.ljust(width)}  {description}\n")
+    stream.write("\nRun 'boring-tasks <command> --help' for the arguments of a command.\n"
+                 "\noptions:\n"
+                 "  --metrics FILE   Save the run's counters and timings (JSON if FILE ends in .json, else Prometheus).\n"
+                 "  --profile FILE   Profile the run with cProfile and save the statistics to FILE.\n"
+                 "  --trace-memory   Trace allocations with tracemalloc and print the largest.\n")
+
+
+if __name__ == "__main__":
+    import instrumentation
+
+    options, arguments = instrumentation.session_options(sys.argv[1:])
+    if not arguments or arguments[0] in ("-h", "--help"):
+        print_usage()
+        sys.exit(0 if arguments else 2)
+
+    if arguments[0] not in COMMANDS:
+        sys.stderr.write(f"boring-tasks: unknown command '{arguments[0]}'\n\n")
+        print_usage(sys.stderr)
+        sys.exit(2)
+
+    if instrumentation.enabled(options):
+        with instrumentation.session(**options):
+            run_command(arguments[0], arguments[1:])
+    else:
+        run_command(arguments[0], arguments[1:])
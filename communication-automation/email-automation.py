@@ -14,18 +14,44 @@
 ########################################################################################################################
 
 import os
+import sys
+import argparse
+import base64
+import queue
+import re
 import smtplib
+import threading
+from collections import OrderedDict
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
-from email import encoders
-from datetime import datetime
+from email.policy import SMTP
 import time
 from dotenv import load_dotenv
 
+from mailmerge import MailMerge, read_rows
+from outbox import Outbox, PermanentError
+from scheduler import Scheduler
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Read attachments in multiples of 57 bytes, so each chunk encodes to whole 76-character base64 lines.
+ATTACHMENT_CHUNK_SIZE = 57 * 16 * 1024
+
+# Lines starting with a dot are doubled in the SMTP DATA stream (RFC 5321 section 4.5.2).
+DOT_AT_LINE_START = re.compile(rb"(?m)^\.")
+
+# Number of serialized attachments kept in memory, so repeated sends reuse them.
+ATTACHMENT_CACHE_SIZE = 4
+
+# Number of merged emails written to the outbox per transaction.
+MERGE_BATCH_SIZE = 1000
+
 
 class EmailScheduler:
     def __init__(self):
@@ -33,6 +59,13 @@ class EmailScheduler:
         self.email_password = os.getenv("EMAIL_PASSWORD")
         self.smtp_server = os.getenv("SMTP_SERVER")
         self.smtp_port = int(os.getenv("SMTP_PORT", 587))
+        self.use_starttls = os.getenv("SMTP_STARTTLS", "true").lower() != "false"
+        self._attachment_cache = OrderedDict()
+        self._attachment_lock = threading.Lock()
+        self._local = threading.local()
+        # The persistent connections of `deliver`, so they can be closed from any thread.
+        self._connections = set()
+        self._connections_lock = threading.Lock()
 
     def send_email(self, recipient, subject, message, attachment_path=None):
         """
@@ -47,9 +80,121 @@ class EmailScheduler:
         Returns:
         None
         """
+        parts = self._message_parts(recipient, subject, message, attachment_path)
+        if parts is None:
+            return
+
+        try:
+            server = self._connect()
+            with instrumentation.span("email_send_seconds"):
+                self._send_parts(server, recipient, parts)
+            server.quit()
+            instrumentation.increment("emails_total", result="sent")
+            print(f"Email sent to {recipient} successfully.")
+        except Exception as e:
+            instrumentation.increment("emails_total", result="failed")
+            print(f"Error sending email to {recipient}: {e}")
+
+    def enqueue_email(self, outbox, recipient, subject, message, attachment_path=None, idempotency_key=None):
+        """
+        Queues an email in a persistent outbox instead of sending it right away.
+
+        Parameters:
+        outbox (Outbox): The outbox to add the email to.
+        recipient (str): The email address of the recipient.
+        subject (str): The subject of the email.
+        message (str): The body content of the email.
+        attachment_path (str): The file path of the attachment (optional).
+        idempotency_key (str): A key that prevents queueing the same email twice (optional).
+
+        Returns:
+        int: The id of the queued message, or None if it was already queued.
+        """
+        payload = {"recipient": recipient, "subject": subject,
+                   "message": message, "attachment_path": attachment_path}
+        return outbox.enqueue("email", payload, idempotency_key)
+
+    def register_outbox(self, outbox, rate=None):
+        """
+        Registers this scheduler as the sender of the outbox's "email" channel.
+
+        Parameters:
+        outbox (Outbox): The outbox to drain.
+        rate (float): The maximum number of emails per second (optional).
+
+        Returns:
+        None
+        """
+        outbox.register("email", lambda payload: self.deliver(**payload), rate, close=self.close_connections)
+
+    def close_connections(self):
+        """
+        Closes the persistent SMTP connections opened by `deliver`, in every thread.
+
+        Returns:
+        None
+        """
+        with self._connections_lock:
+            connections, self._connections = self._connections, set()
+        for server in connections:
+            self._close(server)
+
+    def deliver(self, recipient, subject, message, attachment_path=None):
+        """
+        Sends an email over this thread's persistent SMTP connection, raising on failure
+        so that the caller can retry it.
+
+        Parameters:
+        recipient (str): The email address of the recipient.
+        subject (str): The subject of the email.
+        message (str): The body content of the email.
+        attachment_path (str): The file path of the attachment (optional).
+
+        Returns:
+        None
+        """
+        parts = self._message_parts(recipient, subject, message, attachment_path)
+        if parts is None:
+            raise PermanentError(f"Could not build the email to {recipient}.")
+
+        server = getattr(self._local, "server", None)
+        try:
+            if server is None or server not in self._connections:
+                server = self._local.server = self._connect()
+                with self._connections_lock:
+                    self._connections.add(server)
+            with instrumentation.span("email_send_seconds"):
+                self._send_parts(server, recipient, parts)
+            instrumentation.increment("emails_total", result="sent")
+        except smtplib.SMTPRecipientsRefused as e:
+            instrumentation.increment("emails_total", result="rejected")
+            raise PermanentError(str(e)) from e
+        except Exception:
+            instrumentation.increment("emails_total", result="failed")
+            # Drop a connection in an unknown state; the next attempt reconnects.
+            if server is not None:
+                with self._connections_lock:
+                    self._connections.discard(server)
+                server.close()
+            self._local.server = None
+            raise
+
+    def build_message(self, recipient, subject, message, attachment_path=None):
+        """
+        Builds the MIME message for a recipient, optionally attaching a file.
+
+        Parameters:
+        recipient (str): The email address of the recipient.
+        subject (str): The subject of the email.
+        message (str): The body content of the email.
+        attachment_path (str): The file path of the attachment (optional).
+
+        Returns:
+        email.mime.multipart.MIMEMultipart: The message, or None if it could not be built.
+        """
         if not recipient or not subject:
             print("Error: Recipient and subject are required.")
-            return
+            return None
 
         msg = MIMEMultipart()
         msg['From'] = self.sender_email
@@ -60,30 +205,292 @@ class EmailScheduler:
         # Attach a file if provided
         if attachment_path:
             try:
-                with open(attachment_path, "rb") as attachment:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment.read())
-                encoders.encode_base64(part)
-                part.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename={os.path.basename(attachment_path)}'
-                )
-                msg.attach(part)
+                msg.attach(self._attachment_part(attachment_path))
             except Exception as e:
                 print(f"Error attaching file: {e}")
-                return
+                return None
+
+        return msg
+
+    def serialize_message(self, recipient, subject, message, attachment_path=None):
+        """
+        Builds the message for a recipient as the bytes sent over SMTP.
+
+        Only the headers and the text are serialized per recipient; the attachment is encoded and
+        serialized once per file, and its bytes are reused for every message that carries it.
+
+        Parameters:
+        recipient (str): The email address of the recipient.
+        subject (str): The subject of the email.
+        message (str): The body content of the email.
+        attachment_path (str): The file path of the attachment (optional).
+
+        Returns:
+        bytes: The message with CRLF line endings, or None if it could not be built.
+        """
+        parts = self._message_parts(recipient, subject, message, attachment_path)
+        return None if parts is None else b"".join(parts)
 
+    def _message_parts(self, recipient, subject, message, attachment_path=None):
+        # [message] without an attachment, else [headers and text, shared attachment, closing boundary].
+        msg = self.build_message(recipient, subject, message)
+        if msg is None:
+            return None
+        raw = msg.as_bytes(policy=SMTP)
+        if not attachment_path:
+            return [raw]
+
+        try:
+            attachment = self._attachment_bytes(attachment_path)
+        except Exception as e:
+            print(f"Error attaching file: {e}")
+            return None
+
+        # Splice the attachment in as a second part, before the closing boundary.
+        boundary = msg.get_boundary().encode("ascii")
+        closing = b"--" + boundary + b"--"
+        head = raw[:raw.rindex(closing)] + b"--" + boundary + b"\r\n"
+        return [head, attachment, b"\r\n" + closing + b"\r\n"]
+
+    def _send_parts(self, server, recipient, parts):
+        # smtplib's sendmail would rescan the whole message for lines starting with a dot on every
+        # send. Only the per-recipient parts need it: base64 lines never start with a dot.
+        server.ehlo_or_helo_if_needed()
+        code, response = server.mail(self.sender_email)
+        if code != 250:
+            self._reset(server)
+            raise smtplib.SMTPSenderRefused(code, response, self.sender_email)
+        code, response = server.rcpt(recipient)
+        if code not in (250, 251):
+            self._reset(server)
+            raise smtplib.SMTPRecipientsRefused({recipient: (code, response)})
+        code, response = server.docmd("data")
+        if code != 354:
+            self._reset(server)
+            raise smtplib.SMTPDataError(code, response)
+        for index, part in enumerate(parts):
+            server.send(part if index == 1 else DOT_AT_LINE_START.sub(b"..", part))
+        server.send(b".\r\n")
+        code, response = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
+
+    def _reset(self, server):
         try:
+            server.rset()
+        except smtplib.SMTPServerDisconnected:
+            pass
+
+    def _attachment_part(self, attachment_path):
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(self._attachment_bytes(attachment_path).split(b"\r\n\r\n", 1)[1].decode("ascii"))
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename={os.path.basename(attachment_path)}'
+        )
+        return part
+
+    def _attachment_bytes(self, attachment_path):
+        # The few most recent attachments stay serialized in memory, keyed by path, size and
+        # modification time so an edited file is encoded again.
+        stat = os.stat(attachment_path)
+        key = (os.path.abspath(attachment_path), stat.st_size, stat.st_mtime_ns)
+        with self._attachment_lock:
+            data = self._attachment_cache.get(key)
+            if data is None:
+                data = self._attachment_cache[key] = self._encode_attachment(attachment_path)
+                while len(self._attachment_cache) > ATTACHMENT_CACHE_SIZE:
+                    self._attachment_cache.popitem(last=False)
+            else:
+                self._attachment_cache.move_to_end(key)
+        return data
+
+    def _encode_attachment(self, attachment_path):
+        # The part headers followed by the base64 body, encoded chunk by chunk straight into one
+        # buffer, so the file is never held in memory next to its encoding.
+        part = MIMEBase('application', 'octet-stream')
+        part['Content-Transfer-Encoding'] = 'base64'
+        part.add_header(
+            'Content-Disposition',
+            f'attachment; filename={os.path.basename(attachment_path)}'
+        )
+        encoded = bytearray(part.as_bytes(policy=SMTP))
+        with open(attachment_path, "rb") as attachment:
+            while True:
+                chunk = attachment.read(ATTACHMENT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                encoded += base64.encodebytes(chunk).replace(b"\n", b"\r\n")
+        return encoded
+
+    def send_bulk(self, messages, connections=4, max_messages_per_connection=100, retries=2):
+        """
+        Sends many emails over a pool of persistent, authenticated SMTP connections.
+
+        Each of the `connections` workers opens one connection and reuses it for many messages,
+        instead of connecting, upgrading to TLS and logging in once per recipient. A connection
+        is recycled after `max_messages_per_connection` messages (providers often cap messages
+        per session), and re-opened when it drops; a failed message is retried up to `retries`
+        times on a fresh connection. Attachments are encoded and serialized once for the whole batch.
+
+        Parameters:
+        messages (iterable): Tuples of (recipient, subject, message) or
+                             (recipient, subject, message, attachment_path).
+        connections (int): The number of parallel SMTP connections (default is 4).
+        max_messages_per_connection (int): Messages sent before a connection is recycled (default is 100).
+        retries (int): How many times a failed message is retried (default is 2).
+
+        Returns:
+        dict: The number of messages sent and failed, the elapsed time in seconds and the
+              throughput in messages per second.
+        """
+        work = queue.Queue(maxsize=connections * 100)
+        stats = {"sent": 0, "failed": 0}
+        lock = threading.Lock()
+
+        workers = [threading.Thread(target=self._bulk_worker,
+                                    args=(work, stats, lock, max_messages_per_connection, retries))
+                   for _ in range(connections)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        try:
+            # Feed the queue lazily so large generators are never fully loaded in memory.
+            for item in messages:
+                work.put(item)
+        finally:
+            # Release the workers even if `messages` raised, or they would wait forever.
+            for _ in workers:
+                work.put(None)
+            for worker in workers:
+                worker.join()
+
+        stats["elapsed"] = time.perf_counter() - start
+        stats["rate"] = stats["sent"] / stats["elapsed"] if stats["elapsed"] else 0.0
+        print(f"Sent {stats['sent']} emails ({stats['failed']} failed) in {stats['elapsed']:.2f}s "
+              f"({stats['rate']:.1f} messages/s).")
+        return stats
+
+    def mail_merge(self, recipients_path, subject_template, message_template, attachment_path=None,
+                   email_field="email", outbox=None, campaign=None, **bulk_options):
+        """
+        Sends personalized emails to every recipient of a CSV or JSON Lines file.
+
+        The file is streamed row by row into the sender, so its size does not matter. The
+        templates are parsed once and rendered per row with `str.format` fields, e.g.
+        "Hello {first_name}". Invalid and duplicate addresses are skipped on the fly.
+
+        Parameters:
+        recipients_path (str): The .csv or .jsonl file, one recipient per row.
+        subject_template (str): The subject template.
+        message_template (str): The body template.
+        attachment_path (str): The file path of an attachment shared by every email (optional).
+        email_field (str): The column holding the email address (default is "email").
+        outbox (Outbox): Queue the emails in this outbox instead of sending them (optional).
+        campaign (str): A name used to build idempotency keys when queueing, so that the same
+                        campaign is never queued twice for an address (optional).
+        **bulk_options: Passed to `send_bulk` (connections, max_messages_per_connection, retries).
+
+        Returns:
+        dict: The statistics of `send_bulk`, or the number of queued emails.
+        """
+        merge = MailMerge(subject_template, message_template, email_field)
+        messages = merge.merge(read_rows(recipients_path))
+
+        if outbox is not None:
+            queued = 0
+            batch = []
+            for recipient, subject, message in messages:
+                payload = {"recipient": recipient, "subject": subject,
+                           "message": message, "attachment_path": attachment_path}
+                batch.append((payload, f"{campaign}:{recipient.lower()}" if campaign else None))
+                if len(batch) >= MERGE_BATCH_SIZE:
+                    queued += outbox.enqueue_many("email", batch)
+                    batch = []
+            queued += outbox.enqueue_many("email", batch)
+            merge.summary()
+            print(f"Queued {queued} emails.")
+            return {"queued": queued}
+
+        stats = self.send_bulk(
+            ((recipient, subject, message, attachment_path) for recipient, subject, message in messages),
+            **bulk_options)
+        merge.summary()
+        return stats
+
+    def _connect(self):
+        instrumentation.increment("email_connections_total")
+        with instrumentation.span("email_connect_seconds"):
             server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.sender_email, self.email_password)
-            server.send_message(msg)
+            if self.use_starttls:
+                server.starttls()
+            if self.email_password:
+                server.login(self.sender_email, self.email_password)
+        return server
+
+    def _close(self, server):
+        try:
             server.quit()
-            print(f"Email sent to {recipient} successfully.")
-        except Exception as e:
-            print(f"Error sending email to {recipient}: {e}")
+        except Exception:
+            server.close()
+
+    def _bulk_worker(self, work, stats, lock, max_messages_per_connection, retries):
+        server = None
+        sent_on_connection = 0
+        while True:
+            item = work.get()
+            if item is None:
+                break
 
-    def schedule_daily_email(self, recipient, subject, message, send_time="08:00", attachment_path=None):
+            recipient = item[0]
+            with instrumentation.span("email_build_seconds"):
+                parts = self._message_parts(*item)
+            if parts is None:
+                instrumentation.increment("emails_total", result="failed")
+                with lock:
+                    stats["failed"] += 1
+                continue
+
+            for attempt in range(retries + 1):
+                try:
+                    if server is None or sent_on_connection >= max_messages_per_connection:
+                        if server is not None:
+                            self._close(server)
+                        server = self._connect()
+                        sent_on_connection = 0
+                    with instrumentation.span("email_send_seconds"):
+                        self._send_parts(server, recipient, parts)
+                    sent_on_connection += 1
+                    instrumentation.increment("emails_total", result="sent")
+                    with lock:
+                        stats["sent"] += 1
+                    break
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+                    # The server rejected this message; the connection itself is fine.
+                    print(f"Error sending email to {recipient}: {e}")
+                    instrumentation.increment("emails_total", result="rejected")
+                    with lock:
+                        stats["failed"] += 1
+                    break
+                except Exception as e:
+                    # The connection is in an unknown state: drop it and reconnect.
+                    if server is not None:
+                        server.close()
+                    server = None
+                    if attempt == retries:
+                        print(f"Error sending email to {recipient}: {e}")
+                        instrumentation.increment("emails_total", result="failed")
+                        with lock:
+                            stats["failed"] += 1
+                    else:
+                        instrumentation.increment("email_retries_total")
+
+        if server is not None:
+            self._close(server)
+
+    def schedule_daily_email(self, recipient, subject, message, send_time="08:00", attachment_path=None,
+                             scheduler=None):
         """
         Schedules a daily email to be sent at a specific time, optionally with an attachment.
 
@@ -91,33 +498,68 @@ class EmailScheduler:
         recipient (str): The email address of the recipient.
         subject (str): The subject of the email.
         message (str): The body content of the email.
-        send_time (str): The time in 24-hour format (default is "08:00").
+        send_time (str): The time in 24-hour format (default is "08:00"), or a cron expression.
         attachment_path (str): The file path of the attachment (optional).
+        scheduler (Scheduler): A shared scheduler to add the job to (optional). Without one,
+                               a scheduler is created and this call blocks running it.
 
         Returns:
-        None
+        scheduler.Job: The scheduled job, when a shared scheduler is given.
         """
         print(f"Scheduling daily email to {recipient} at {send_time}...")
-        while True:
-            current_time = datetime.now().strftime("%H:%M")
-            if current_time == send_time:
-                self.send_email(recipient, subject, message, attachment_path)
-                time.sleep(60)
+        owns_scheduler = scheduler is None
+        if owns_scheduler:
+            scheduler = Scheduler(os.getenv("SCHEDULER_STATE_PATH"))
+
+        job = scheduler.add_job(f"email:{recipient}:{subject}:{send_time}", send_time,
+                                self.send_email, recipient, subject, message, attachment_path)
+        if owns_scheduler:
+            scheduler.run_forever()
+        return job
 
 
 if __name__ == "__main__":
+    instrumentation.main_session()
+    parser = argparse.ArgumentParser(
+        description="Send emails to one recipient or mail-merge a CSV/JSON Lines recipient list.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--recipient", help="The email address of a single recipient.")
+    target.add_argument("--recipients",
+                        help="A .csv or .jsonl file with one recipient per row, streamed row by row.")
+    parser.add_argument("--subject", required=True,
+                        help="The subject; may use {field} placeholders from the recipients file.")
+    body = parser.add_mutually_exclusive_group(required=True)
+    body.add_argument("--body", help="The message; may use {field} placeholders from the recipients file.")
+    body.add_argument("--body-file", help="A file containing the message template.")
+    parser.add_argument("--attachment", help="The file path of an attachment.")
+    parser.add_argument("--email-column", default="email",
+                        help="The column holding the email address (default is 'email').")
+    parser.add_argument("--connections", type=int, default=4,
+                        help="The number of parallel SMTP connections (default is 4).")
+    parser.add_argument("--outbox", help="Queue the emails in this outbox database instead of sending them.")
+    parser.add_argument("--campaign", help="A campaign name that prevents queueing the same email twice.")
+    args = parser.parse_args()
+
     email_scheduler = EmailScheduler()
+    email_message = args.body
+    if args.body_file:
+        with open(args.body_file, encoding="utf-8") as body_file:
+            email_message = body_file.read()
 
-    recipients = ["abc@gmail.com", "def@yahoo.com"]
-    email_subject = "Daily Reminder"
-    email_message = "This is your daily reminder to check your tasks and prepare your max!"
-    # Replace with the actual path to your file
-    attachment = "path/to/your/file.pdf"
+    if args.recipient:
+        email_scheduler.send_email(args.recipient, args.subject, email_message, args.attachment)
+    else:
+        email_scheduler.mail_merge(args.recipients, args.subject, email_message, args.attachment,
+                                   email_field=args.email_column,
+                                   outbox=Outbox(args.outbox) if args.outbox else None,
+                                   campaign=args.campaign, connections=args.connections)
 
-    # Send emails directly
-    for recipient in recipients:
-        email_scheduler.send_email(
-            recipient, email_subject, email_message, attachment)
+    # To schedule daily emails for every recipient in one process instead:
+    # reminders = Scheduler(os.getenv("SCHEDULER_STATE_PATH"))
+    # for recipient in ["abc@gmail.com", "def@yahoo.com"]:
+    #     email_scheduler.schedule_daily_email(recipient, args.subject, email_message,
+    #                                          attachment_path=args.attachment, scheduler=reminders)
+    # reminders.run_forever()
 
-    # Uncomment to schedule daily emails
-    # email_scheduler.schedule_daily_email(recipients[0], email_subject, email_message, attachment_path=attachment)
+    # Emails queued with --outbox are sent, with retries, by:
+    # python outbox.py <outbox.db> --run
@@ -0,0 +1,156 @@
+########################################################################################################################
+# Streaming Mail Merge                                                                                                 #
+#                                                                                                                      #
+# This module personalizes messages for large recipient lists stored as CSV or JSON Lines. Rows are read one at a time #
+# so the file is never loaded in memory, templates are parsed once and rendered per row, and addresses are validated   #
+# and deduplicated on the fly.                                                                                         #
+#                                                                                                                      #
+# Templates use `str.format` fields, e.g. "Hello {first_name}, your report for {week} is ready."                       #
+########################################################################################################################
+
+import csv
+import hashlib
+import json
+import os
+import re
+from string import Formatter
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class MergeTemplate:
+    def __init__(self, template: str):
+        """
+        Parse the template once into literal text and field names.
+
+        Parameters:
+        template (str): A `str.format` template with named fields.
+        """
+        self.template = template
+        self.parts = []
+        for literal, field, format_spec, conversion in Formatter().parse(template):
+            if literal:
+                self.parts.append((True, literal))
+            if field is not None:
+                if format_spec or conversion or not field.isidentifier():
+                    # Rare: keep full `str.format` semantics for this field.
+                    self.parts.append((False, ("{" + field + ("!" + conversion if conversion else "")
+                                               + (":" + format_spec if format_spec else "") + "}")))
+                else:
+                    self.parts.append((None, field))
+        self.fields = {value for kind, value in self.parts if kind is None}
+
+    def render(self, row: dict) -> str:
+        """
+        Render the template for one row.
+
+        Parameters:
+        row (dict): The values of the fields.
+
+        Returns:
+        str: The rendered text.
+
+        Raises:
+        KeyError: If the row has no value for a field of the template.
+        """
+        rendered = []
+        for kind, value in self.parts:
+            if kind is True:
+                rendered.append(value)
+            elif kind is None:
+                rendered.append(str(row[value]))
+            else:
+                rendered.append(value.format(**row))
+        return "".join(rendered)
+
+
+def read_rows(path: str):
+    """
+    Stream the rows of a CSV (with a header line) or JSON Lines file as dicts.
+
+    Parameters:
+    path (str): The recipients file, ending in .csv, .jsonl or .ndjson.
+
+    Yields:
+    dict: One row at a time.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    # utf-8-sig drops the byte order mark Excel writes at the start of "CSV UTF-8" files.
+    with open(path, newline="", encoding="utf-8-sig") as recipients_file:
+        if extension == ".csv":
+            yield from csv.DictReader(recipients_file)
+        elif extension in (".jsonl", ".ndjson"):
+            for line_number, line in enumerate(recipients_file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    print(f"Skipping line {line_number} of {path}: {e}")
+        else:
+            raise ValueError(f"Unsupported recipients file '{path}': expected .csv or .jsonl.")
+
+
+class MailMerge:
+    def __init__(self, subject_template: str, message_template: str, email_field: str = "email"):
+        """
+        Initialize the merge with the subject and body templates.
+
+        Parameters:
+        subject_template (str): The subject template.
+        message_template (str): The body template.
+        email_field (str): The row field holding the recipient address (default is "email").
+        """
+        self.subject = MergeTemplate(subject_template)
+        self.message = MergeTemplate(message_template)
+        self.email_field = email_field
+        self.merged = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.failed = 0
+        # 8-byte digests keep memory low for hundreds of thousands of addresses.
+        self._seen = set()
+
+    def merge(self, rows):
+        """
+        Turn rows into personalized messages, skipping invalid and duplicate addresses.
+
+        Parameters:
+        rows (iterable): Dicts, e.g. from `read_rows`.
+
+        Yields:
+        tuple: (recipient, subject, message) for each valid, first-seen recipient.
+        """
+        for row in rows:
+            address = (row.get(self.email_field) or "").strip()
+            if not EMAIL_PATTERN.match(address):
+                self.invalid += 1
+                continue
+
+            digest = hashlib.blake2b(address.lower().encode("utf-8"), digest_size=8).digest()
+            if digest in self._seen:
+                self.duplicates += 1
+                continue
+
+            try:
+                subject = self.subject.render(row)
+                message = self.message.render(row)
+            except (KeyError, IndexError, ValueError) as e:
+                print(f"Skipping {address}: missing or invalid field {e}")
+                self.failed += 1
+                continue
+
+            # Only once rendered, so a later valid row for the address is not taken for a duplicate.
+            self._seen.add(digest)
+            self.merged += 1
+            yield address, subject, message
+
+    def summary(self):
+        """
+        Print how many rows were merged and skipped.
+
+        Returns:
+        None
+        """
+        print(f"Merged: {self.merged}, invalid addresses: {self.invalid}, "
+              f"duplicates: {self.duplicates}, template errors: {self.failed}")
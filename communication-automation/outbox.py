@@ -0,0 +1,357 @@
+########################################################################################################################
+# Persistent Outbox                                                                                                    #
+#                                                                                                                      #
+# This module stores outgoing messages (emails, SMS) in a local SQLite database so that producers can enqueue them     #
+# cheaply and nothing is lost when a send fails or the process stops. A pool of worker threads drains the outbox      #
+# concurrently: failed sends are retried with exponential backoff, messages that keep failing are dead-lettered, and  #
+# each channel can be capped to a number of messages per second.                                                       #
+#                                                                                                                      #
+# Usage: python outbox.py <outbox.db> [--requeue-dead]                                                                 #
+#        python outbox.py <outbox.db> --run [--workers 4]                                                              #
+########################################################################################################################
+
+import argparse
+import importlib.util
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ratelimit import TokenBucket
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying a message cannot help, e.g. an invalid address."""
+
+
+class Outbox:
+    def __init__(self, path: str = "outbox.db", max_attempts: int = 5, backoff: float = 2.0,
+                 max_backoff: float = 600.0, lease: float = 300.0):
+        """
+        Open (and create if needed) the outbox database.
+
+        Parameters:
+        path (str): The SQLite database file (default is "outbox.db").
+        max_attempts (int): Attempts before a message is dead-lettered (default is 5).
+        backoff (float): Delay in seconds before the first retry, doubled on each attempt (default is 2).
+        max_backoff (float): The longest delay between two attempts (default is 600).
+        lease (float): Seconds after which a message claimed by a crashed worker is retried (default is 300).
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self.handlers = {}
+        self.limits = {}
+        self.closers = {}
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def register(self, channel: str, handler, rate: float = None, close=None):
+        """
+        Register the function that sends the messages of a channel.
+
+        Parameters:
+        channel (str): The channel name, e.g. "email" or "sms".
+        handler (callable): Called with the message payload (dict); must raise on failure, and raise
+                            `PermanentError` when the message should be dead-lettered right away.
+        rate (float): The maximum number of messages per second for this channel (optional).
+        close (callable): Called without arguments when `run()` returns, e.g. to close the
+                          connections the handler kept open (optional).
+
+        Returns:
+        None
+        """
+        self.handlers[channel] = handler
+        if rate:
+            self.limits[channel] = TokenBucket(rate)
+        if close:
+            self.closers[channel] = close
+
+    def enqueue(self, channel: str, payload: dict, idempotency_key: str = None, delay: float = 0.0):
+        """
+        Add a message to the outbox. This is a single local insert and never blocks on the network.
+
+        Parameters:
+        channel (str): The channel the message is sent through.
+        payload (dict): JSON-serializable arguments for the channel's handler.
+        idempotency_key (str): A unique key; enqueueing the same key twice is a no-op (optional).
+        delay (float): Seconds to wait before the first attempt (default is 0).
+
+        Returns:
+        int: The id of the new message, or None if the idempotency key was already used.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO outbox (channel, payload, idempotency_key, next_attempt_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (channel, json.dumps(payload), idempotency_key, now + delay, now))
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def enqueue_many(self, channel: str, items):
+        """
+        Add many messages to the outbox in a single transaction.
+
+        Parameters:
+        channel (str): The channel the messages are sent through.
+        items (iterable): (payload, idempotency_key) pairs; the key may be None.
+
+        Returns:
+        int: The number of messages added (duplicates of an idempotency key are ignored).
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN")
+        try:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO outbox (channel, payload, idempotency_key, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ((channel, json.dumps(payload), key, now, now) for payload, key in items))
+            added = connection.total_changes - before
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return added
+
+    def run(self, workers: int = 4, until_empty: bool = True, poll_interval: float = 1.0):
+        """
+        Drain the outbox with a pool of worker threads.
+
+        Parameters:
+        workers (int): The number of concurrent senders (default is 4).
+        until_empty (bool): Return once every message of the registered channels is sent or
+                            dead-lettered, waiting out the backoff of retries (default is True);
+                            otherwise keep waiting for new messages until interrupted.
+        poll_interval (float): The longest wait when no message is due (default is 1).
+
+        Returns:
+        dict: The number of messages per status.
+        """
+        self._stop = threading.Event()
+        start = time.perf_counter()
+        sent_before = self.stats().get("sent", 0)
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self._work, until_empty, poll_interval) for _ in range(workers)]
+                try:
+                    for future in futures:
+                        future.result()
+                except KeyboardInterrupt:
+                    self._stop.set()
+        finally:
+            for channel, close in self.closers.items():
+                try:
+                    close()
+                except Exception as e:
+                    print(f"Error closing the {channel} channel: {e}")
+
+        stats = self.stats()
+        elapsed = time.perf_counter() - start
+        sent = stats.get("sent", 0) - sent_before
+        print(f"Outbox: sent {sent} message(s) in {elapsed:.2f}s "
+              f"({sent / elapsed if elapsed else 0.0:.1f} messages/s), status: {stats}")
+        return stats
+
+    def stop(self):
+        """
+        Ask the workers of `run()` to stop after their current message.
+
+        Returns:
+        None
+        """
+        if hasattr(self, "_stop"):
+            self._stop.set()
+
+    def stats(self):
+        """
+        Count the messages in each status (pending, sending, sent, dead).
+
+        Returns:
+        dict: The number of messages per status.
+        """
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM outbox GROUP BY status")
+        return dict(rows.fetchall())
+
+    def dead_letters(self):
+        """
+        List the messages that were given up on.
+
+        Returns:
+        list: Dicts with the id, channel, payload, attempts and last error of each message.
+        """
+        rows = self._connection().execute(
+            "SELECT id, channel, payload, attempts, last_error FROM outbox WHERE status = 'dead' ORDER BY id")
+        return [{"id": row[0], "channel": row[1], "payload": json.loads(row[2]),
+                 "attempts": row[3], "last_error": row[4]} for row in rows]
+
+    def requeue_dead(self):
+        """
+        Put every dead-lettered message back in the queue with a fresh attempt count.
+
+        Returns:
+        int: The number of messages requeued.
+        """
+        cursor = self._connection().execute(
+            "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ? WHERE status = 'dead'",
+            (time.time(),))
+        return cursor.rowcount
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; claims use explicit transactions.
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _channels(self):
+        # Only messages of registered channels are claimed; the others wait for a process that can send them.
+        channels = list(self.handlers)
+        return ", ".join("?" * len(channels)), channels
+
+    def _claim(self):
+        placeholders, channels = self._channels()
+        if not channels:
+            return None
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT id, channel, payload, attempts FROM outbox "
+                "WHERE ((status = 'pending' AND next_attempt_at <= ?) OR (status = 'sending' AND lease_until < ?)) "
+                f"AND channel IN ({placeholders}) ORDER BY next_attempt_at LIMIT 1",
+                (now, now, *channels)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE outbox SET status = 'sending', lease_until = ? WHERE id = ?",
+                                   (now + self.lease, row[0]))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return row
+
+    def _next_attempt_at(self):
+        placeholders, channels = self._channels()
+        if not channels:
+            return None
+        return self._connection().execute(
+            f"SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending' AND channel IN ({placeholders})",
+            channels).fetchone()[0]
+
+    def _work(self, until_empty, poll_interval):
+        while not self._stop.is_set():
+            row = self._claim()
+            if row is None:
+                next_attempt_at = self._next_attempt_at()
+                if until_empty and next_attempt_at is None:
+                    return
+                # Sleep until the next retry is due, but poll at least every poll_interval.
+                delay = poll_interval if next_attempt_at is None else next_attempt_at - time.time()
+                self._stop.wait(max(0.0, min(delay, poll_interval)))
+                continue
+
+            message_id, channel, payload, attempts = row
+            try:
+                handler = self.handlers[channel]
+                if channel in self.limits:
+                    self.limits[channel].acquire()
+                handler(json.loads(payload))
+            except Exception as e:
+                self._fail(message_id, attempts + 1, e)
+            else:
+                self._connection().execute(
+                    "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL WHERE id = ?",
+                    (attempts + 1, time.time(), message_id))
+
+    def _fail(self, message_id, attempts, error):
+        if attempts >= self.max_attempts or isinstance(error, PermanentError):
+            print(f"Giving up on message {message_id} after {attempts} attempt(s): {error}")
+            self._connection().execute(
+                "UPDATE outbox SET status = 'dead', attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, str(error), message_id))
+            return
+
+        # Exponential backoff with jitter, so failed messages do not retry in lockstep.
+        delay = min(self.backoff * 2 ** (attempts - 1), self.max_backoff) * random.uniform(0.5, 1.0)
+        self._connection().execute(
+            "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+            (attempts, time.time() + delay, str(error), message_id))
+
+
+def register_senders(outbox):
+    """
+    Register the email and SMS scripts of this folder as the senders of the "email" and "sms" channels.
+
+    Parameters:
+    outbox (Outbox): The outbox to drain.
+
+    Returns:
+    None
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+
+    def load(file_name):
+        spec = importlib.util.spec_from_file_location(file_name[:-3].replace("-", "_"),
+                                                      os.path.join(folder, file_name))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    load("email-automation.py").EmailScheduler().register_outbox(outbox)
+    load("sms-automation.py").register_outbox(outbox)
+
+
+if __name__ == "__main__":
+    instrumentation.main_session()
+    parser = argparse.ArgumentParser(description="Inspect or drain a persistent outbox.")
+    parser.add_argument("path", help="The outbox database file.")
+    parser.add_argument("--requeue-dead", action="store_true",
+                        help="Put dead-lettered messages back in the queue.")
+    parser.add_argument("--run", action="store_true",
+                        help="Send the queued emails and SMS, with retries, until none is left.")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="The number of concurrent senders with --run (default is 4).")
+    args = parser.parse_args()
+
+    outbox = Outbox(args.path)
+    if args.requeue_dead:
+        print(f"Requeued {outbox.requeue_dead()} message(s).")
+    if args.run:
+        register_senders(outbox)
+        outbox.run(workers=args.workers)
+    print(f"Status: {outbox.stats()}")
+    for letter in outbox.dead_letters():
+        print(f"Dead: #{letter['id']} {letter['channel']} after {letter['attempts']} attempt(s): "
+              f"{letter['last_error']}")
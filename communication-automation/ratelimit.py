@@ -0,0 +1,51 @@
+########################################################################################################################
+# Token Bucket Rate Limiter                                                                                            #
+#                                                                                                                      #
+# This module limits how many messages per second are handed to a provider (SMTP server, Twilio, ...). The bucket      #
+# refills continuously at `rate` tokens per second and holds at most `burst` tokens. It is thread-safe, so one bucket  #
+# can be shared by every worker sending through the same account.                                                     #
+########################################################################################################################
+
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = None):
+        """
+        Initialize the bucket, full.
+
+        Parameters:
+        rate (float): The number of tokens added per second.
+        burst (float): The maximum number of tokens (optional, defaults to `rate`, at least 1).
+        """
+        if rate <= 0:
+            raise ValueError("Rate must be positive.")
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Take tokens from the bucket, sleeping until enough are available.
+
+        Parameters:
+        tokens (float): The number of tokens to take (default is 1).
+
+        Returns:
+        float: The number of seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
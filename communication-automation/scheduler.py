@@ -0,0 +1,281 @@
+########################################################################################################################
+# Job Scheduler                                                                                                        #
+#                                                                                                                      #
+# This module runs many cron-like jobs (email and SMS reminders) in one process. Jobs are kept in a timer heap and the #
+# scheduler sleeps until the next one is due instead of polling the clock. Runs missed while the process was down are  #
+# caught up once at startup, and the time of each job's last run is persisted across restarts.                         #
+#                                                                                                                      #
+# Schedules are either "HH:MM" (every day at that time) or a five-field cron expression                                #
+# "minute hour day-of-month month day-of-week", supporting `*`, lists, ranges and steps (e.g. "*/15 8-18 * * 1-5").    #
+########################################################################################################################
+
+import heapq
+import itertools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, time as day_time
+
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+
+class CronSchedule:
+    def __init__(self, expression: str):
+        """
+        Parse a schedule expression.
+
+        Parameters:
+        expression (str): "HH:MM" for a daily time, or a five-field cron expression.
+        """
+        self.expression = expression.strip()
+        if ":" in self.expression and " " not in self.expression:
+            hour, minute = self.expression.split(":")
+            fields = [minute, hour, "*", "*", "*"]
+        else:
+            fields = self.expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid schedule '{expression}': expected 'HH:MM' or five cron fields.")
+
+        parsed = [self._parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = parsed
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def next_after(self, after: datetime) -> datetime:
+        """
+        Compute the first time strictly after `after` that matches the schedule.
+
+        Parameters:
+        after (datetime): The reference time.
+
+        Returns:
+        datetime: The next due time, at minute precision.
+        """
+        start = (after + timedelta(minutes=1)).replace(second=0, microsecond=0)
+        day = start.date()
+        # Five years covers every valid expression, including "29 February".
+        for offset in range(366 * 5):
+            if day.month in self.months and self._day_matches(day):
+                for hour in self.hours:
+                    if offset == 0 and hour < start.hour:
+                        continue
+                    for minute in self.minutes:
+                        if offset == 0 and hour == start.hour and minute < start.minute:
+                            continue
+                        return datetime.combine(day, day_time(hour, minute))
+            day += timedelta(days=1)
+        raise ValueError(f"Schedule '{self.expression}' never matches.")
+
+    def _day_matches(self, day):
+        weekday = (day.weekday() + 1) % 7  # cron counts from Sunday = 0
+        if self.any_day or self.any_weekday:
+            return day.day in self.days and weekday in self.weekdays
+        # Like cron, a restricted day-of-month and day-of-week match either way.
+        return day.day in self.days or weekday in self.weekdays
+
+    def _parse_field(self, field, low, high):
+        values = set()
+        for part in field.split(","):
+            value_range, _, step = part.partition("/")
+            if value_range == "*":
+                start, end = low, high
+            elif "-" in value_range:
+                start, end = (int(value) for value in value_range.split("-"))
+            else:
+                start = end = int(value_range)
+                if step:
+                    end = high
+            if start < low or end > high or start > end:
+                raise ValueError(f"Invalid schedule field '{field}': values must be within {low}-{high}.")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        if high == 7:
+            # Both 0 and 7 mean Sunday.
+            values = {value % 7 for value in values}
+        return sorted(values)
+
+
+class Job:
+    def __init__(self, job_id, schedule, func, args=(), kwargs=None, last_run=None):
+        self.job_id = job_id
+        self.schedule = schedule
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.last_run = last_run
+        self.next_run = None
+        self.running = False
+
+
+class Scheduler:
+    def __init__(self, state_path: str = None, workers: int = 4):
+        """
+        Initialize the scheduler.
+
+        Parameters:
+        state_path (str): JSON file where the last run of each job is persisted (optional).
+        workers (int): The number of threads that run due jobs (default is 4).
+        """
+        self.state_path = state_path
+        self.workers = workers
+        self.jobs = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._executor = None
+        self._wakeup = threading.Event()
+        self._running = False
+        self._state = self._load_state()
+
+    def add_job(self, job_id: str, schedule: str, func, *args, **kwargs):
+        """
+        Register a job. If it has run before and a run was missed since, it is due immediately.
+
+        Parameters:
+        job_id (str): A stable identifier, used to persist the job's state.
+        schedule (str): "HH:MM" or a five-field cron expression.
+        func (callable): The function to call when the job is due.
+        *args, **kwargs: The arguments to call `func` with.
+
+        Returns:
+        Job: The registered job.
+        """
+        last_run = self._state.get(job_id)
+        job = Job(job_id, CronSchedule(schedule), func, args, kwargs,
+                  datetime.fromisoformat(last_run) if last_run else None)
+
+        now = datetime.now()
+        if job.last_run is not None and job.schedule.next_after(job.last_run) <= now:
+            job.next_run = now
+        else:
+            job.next_run = job.schedule.next_after(now)
+
+        with self._lock:
+            self.jobs[job_id] = job
+            heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+        self._wakeup.set()
+        return job
+
+    def remove_job(self, job_id: str):
+        """
+        Unregister a job. It is dropped from the heap lazily, when it reaches the top.
+
+        Parameters:
+        job_id (str): The identifier the job was added with.
+
+        Returns:
+        None
+        """
+        with self._lock:
+            self.jobs.pop(job_id, None)
+
+    def run_pending(self, now: datetime = None):
+        """
+        Start every job that is due on the worker threads, and reschedule it. Jobs run in the
+        background, so a slow job never delays the others; a job still running from its previous
+        run is skipped this time. The state is saved as each job finishes.
+
+        Parameters:
+        now (datetime): The current time (optional, defaults to the system clock).
+
+        Returns:
+        int: The number of jobs started.
+        """
+        now = now or datetime.now()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job = heapq.heappop(self._heap)
+                if self.jobs.get(job.job_id) is not job:
+                    continue
+                if job.running:
+                    print(f"Skipping job '{job.job_id}': its previous run has not finished.")
+                else:
+                    job.running = True
+                    job.last_run = now
+                    due.append(job)
+                job.next_run = job.schedule.next_after(now)
+                heapq.heappush(self._heap, (job.next_run, next(self._counter), job))
+            if due and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        for job in due:
+            self._executor.submit(self._run_job, job, now)
+        return len(due)
+
+    def wait(self):
+        """
+        Wait for the jobs started so far to finish.
+
+        Returns:
+        None
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def run_forever(self):
+        """
+        Sleep until the next job is due, run it, and repeat until `stop()` is called.
+
+        Returns:
+        None
+        """
+        self._running = True
+        print(f"Scheduler running {len(self.jobs)} job(s)...")
+        try:
+            while self._running:
+                self.run_pending()
+                with self._lock:
+                    next_run = self._heap[0][0] if self._heap else None
+                timeout = None if next_run is None else max((next_run - datetime.now()).total_seconds(), 0)
+                # Waking up on a new job or stop() keeps the heap's head accurate.
+                self._wakeup.wait(timeout)
+                self._wakeup.clear()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.wait()
+
+    def stop(self):
+        """
+        Stop `run_forever()`.
+
+        Returns:
+        None
+        """
+        self._running = False
+        self._wakeup.set()
+
+    def _run_job(self, job, run_time):
+        try:
+            job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            print(f"Error running job '{job.job_id}': {e}")
+        finally:
+            job.running = False
+            # Only finished runs are persisted: a run cut short by a crash is caught up at restart.
+            self._save_state(job.job_id, run_time)
+
+    def _load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        try:
+            with open(self.state_path, encoding="utf-8") as state_file:
+                return json.load(state_file)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Ignoring unreadable scheduler state {self.state_path}: {e}")
+            return {}
+
+    def _save_state(self, job_id, run_time):
+        if not self.state_path:
+            return
+        # Jobs finish on several threads; one writer at a time.
+        with self._state_lock:
+            self._state[job_id] = run_time.isoformat()
+            temp_path = f"{self.state_path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as state_file:
+                json.dump(self._state, state_file)
+            os.replace(temp_path, self.state_path)
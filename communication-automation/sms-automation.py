@@ -1,9 +1,18 @@
 import os
-from twilio.rest import Client
-from datetime import datetime
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from outbox import PermanentError
+from ratelimit import TokenBucket
+from scheduler import Scheduler
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
 
 # Load environment variables from .env file
 load_dotenv()
@@ -12,35 +21,120 @@ load_dotenv()
 TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE_NUMBER = os.getenv("TWILIO_PHONE_NUMBER")
+# Messages per second allowed by the account (1 for a standard long code)
+TWILIO_MESSAGES_PER_SECOND = float(os.getenv("TWILIO_MESSAGES_PER_SECOND", 1))
+
+# The Twilio client is created on first use, so importing this module is cheap and works without credentials
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from twilio.rest import Client
+                _client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return _client
+
 
-# Initialize Twilio client
-client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+def twilio_transport(to_number, message):
+    get_client().messages.create(
+        body=message,
+        from_=TWILIO_PHONE_NUMBER,
+        to=to_number
+    )
 
 
 def send_text_message(to_number, message):
     try:
-        message = client.messages.create(
-            body=message,
-            from_=TWILIO_PHONE_NUMBER,
-            to=to_number
-        )
+        deliver_text_message(to_number, message)
         print(f"Message sent to {to_number} successfully.")
     except Exception as e:
         print(f"Error sending message to {to_number}: {e}")
 
+
+def deliver_text_message(to_number, message, transport=None):
+    # Raise on failure so the outbox can retry the message
+    if not to_number or not message:
+        raise PermanentError("Recipient number and message are required.")
+    try:
+        with instrumentation.span("sms_send_seconds"):
+            (transport or twilio_transport)(to_number, message)
+    except Exception:
+        instrumentation.increment("sms_total", result="failed")
+        raise
+    instrumentation.increment("sms_total", result="sent")
+
+# Send many SMS concurrently, without exceeding the account's messages-per-second cap.
+# `messages` yields (to_number, message) pairs; `transport(to_number, message)` defaults to Twilio
+# and can be replaced by a local fake for load tests.
+
+
+def send_bulk_text_messages(messages, workers=8, rate=None, transport=None):
+    # No burst: the cap applies to every second, including the first one
+    bucket = TokenBucket(rate or TWILIO_MESSAGES_PER_SECOND, burst=1)
+    stats = {"sent": 0, "failed": 0}
+    lock = threading.Lock()
+    # Bound the number of queued sends so large generators are not loaded in memory
+    in_flight = threading.BoundedSemaphore(workers * 4)
+
+    def send(to_number, message):
+        try:
+            with instrumentation.span("sms_rate_limit_wait_seconds"):
+                bucket.acquire()
+            deliver_text_message(to_number, message, transport)
+            with lock:
+                stats["sent"] += 1
+        except Exception as e:
+            print(f"Error sending message to {to_number}: {e}")
+            with lock:
+                stats["failed"] += 1
+        finally:
+            in_flight.release()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for to_number, message in messages:
+            in_flight.acquire()
+            executor.submit(send, to_number, message)
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["rate"] = stats["sent"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    print(f"Sent {stats['sent']} messages ({stats['failed']} failed) in {stats['elapsed']:.2f}s "
+          f"({stats['rate']:.1f} messages/s).")
+    return stats
+
+# Queue SMS in a persistent outbox instead of sending them synchronously
+
+
+def enqueue_text_message(outbox, to_number, message, idempotency_key=None):
+    return outbox.enqueue("sms", {"to_number": to_number, "message": message}, idempotency_key)
+
+
+def register_outbox(outbox, rate=None, transport=None):
+    outbox.register("sms", lambda payload: deliver_text_message(transport=transport, **payload),
+                    rate or TWILIO_MESSAGES_PER_SECOND)
+
 # Schedule daily SMS reminders (e.g., every day at 8 am)
 
 
-def schedule_daily_text(to_number, message, send_time="08:00"):
-    while True:
-        current_time = datetime.now().strftime("%H:%M")
-        if current_time == send_time:
-            send_text_message(to_number, message)
-            # Wait a minute to avoid resending within the same minute
-            time.sleep(60)
+def schedule_daily_text(to_number, message, send_time="08:00", scheduler=None):
+    # Without a shared scheduler, create one and block running it
+    owns_scheduler = scheduler is None
+    if owns_scheduler:
+        scheduler = Scheduler(os.getenv("SCHEDULER_STATE_PATH"))
+
+    job = scheduler.add_job(f"sms:{to_number}:{send_time}", send_time,
+                            send_text_message, to_number, message)
+    if owns_scheduler:
+        scheduler.run_forever()
+    return job
 
 
 if __name__ == "__main__":
+    instrumentation.main_session()
 
     # Usage
     recipient_number = "+1234567890"  # Replace with the recipient's phone number
@@ -51,3 +145,6 @@ if __name__ == "__main__":
 
     # Or send a single text message immediately
     send_text_message(recipient_number, sms_message)
+
+    # Or send to many numbers at once, within the account's rate limit
+    # send_bulk_text_messages((number, sms_message) for number in ["+1234567890", "+1987654321"])
@@ -0,0 +1,293 @@
+########################################################################################################################
+# Activity Index                                                                                                       #
+#                                                                                                                      #
+# This module keeps the activities extracted from a folder of weekly Word reports in a SQLite database, so that months #
+# of reports can be searched without reprocessing every document. Updates are incremental: a document is re-extracted #
+# only when its size or modification time changed and its content fingerprint (SHA-256) differs, and every document  #
+# is re-extracted when the category configuration changes.                                                           #
+#                                                                                                                      #
+# Activities can be queried by category, report date range and full-text term (SQLite FTS5 when available).           #
+#                                                                                                                      #
+# Usage: python activityindex.py update <directory> [--db activities.db] [--categories categories.json]               #
+#        python activityindex.py query [--category Learning] [--since 2024-01-01] [--until 2024-12-31] [--text react]  #
+#        python activityindex.py query --match 'react AND (hooks OR redux)'                                            #
+########################################################################################################################
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+
+from extraction import extract_document, load_categories
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    report_date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS activities (
+    id INTEGER PRIMARY KEY,
+    document_path TEXT NOT NULL REFERENCES documents (path) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS activities_document ON activities (document_path);
+CREATE INDEX IF NOT EXISTS activities_category ON activities (category);
+CREATE INDEX IF NOT EXISTS documents_report_date ON documents (report_date);
+"""
+
+DATE_PATTERN = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+
+def fingerprint(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def categories_fingerprint(lookup):
+    return hashlib.sha256(json.dumps(lookup, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def report_date(file_path, mtime_ns):
+    # A YYYY-MM-DD date in the file name wins over the modification time.
+    match = DATE_PATTERN.search(os.path.basename(file_path))
+    if match:
+        try:
+            return date(*(int(part) for part in match.groups())).isoformat()
+        except ValueError:
+            pass
+    return date.fromtimestamp(mtime_ns / 1e9).isoformat()
+
+
+def match_terms(text):
+    # Quote each word as an FTS5 string, so "node.js", "C++" or "don't" are searched literally.
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+class ActivityIndex:
+    def __init__(self, db_path="activities.db"):
+        """
+        Open (and create if needed) the activity index.
+
+        Parameters:
+        db_path (str): The SQLite database file (default is "activities.db").
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS activities_fts USING fts5 (text, content='activities', "
+                "content_rowid='id')")
+            self.full_text = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to LIKE queries.
+            self.full_text = False
+
+    def update(self, directory, categories_path=None, workers=None):
+        """
+        Bring the index up to date with the Word documents of a directory.
+
+        Unchanged documents (same size and modification time) are skipped without being read;
+        touched documents are fingerprinted and re-extracted only if their content changed;
+        documents that disappeared are removed from the index. Every document is re-extracted
+        when the categories differ from those of the previous update.
+
+        Parameters:
+        directory (str): The directory holding the .docx files.
+        categories_path (str): A JSON file listing the categories (optional).
+        workers (int): The number of extraction processes (optional, defaults to the CPU count).
+
+        Returns:
+        dict: The number of documents added or changed, unchanged, removed and failed.
+        """
+        with instrumentation.span("activity_index_update_seconds"):
+            return self._update(directory, categories_path, workers)
+
+    def _update(self, directory, categories_path, workers):
+        lookup = load_categories(categories_path)
+        lookup_fingerprint = categories_fingerprint(lookup)
+        stored = self.connection.execute("SELECT value FROM meta WHERE key = 'categories'").fetchone()
+        # Activities extracted with other categories are stale, even in unchanged documents.
+        categories_changed = stored is None or stored[0] != lookup_fingerprint
+        known = {row[0]: row[1:] for row in self.connection.execute(
+            "SELECT path, size, mtime_ns, fingerprint FROM documents")}
+        stats = {"indexed": 0, "unchanged": 0, "removed": 0, "failed": 0}
+
+        seen = set()
+        to_extract = {}
+        for entry in os.scandir(directory):
+            if not entry.is_file() or not entry.name.lower().endswith(".docx") or entry.name.startswith("~$"):
+                continue
+            path = os.path.abspath(entry.path)
+            seen.add(path)
+            stat = entry.stat()
+            previous = None if categories_changed else known.get(path)
+            if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                stats["unchanged"] += 1
+                continue
+
+            content_fingerprint = fingerprint(path)
+            if previous and previous[2] == content_fingerprint:
+                # Touched but identical: only refresh the stat signature.
+                self.connection.execute("UPDATE documents SET size = ?, mtime_ns = ? WHERE path = ?",
+                                        (stat.st_size, stat.st_mtime_ns, path))
+                stats["unchanged"] += 1
+                continue
+            to_extract[path] = (stat, content_fingerprint)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(extract_document, ((path, lookup) for path in to_extract), chunksize=4)
+            for result in results:
+                if "error" in result:
+                    print(f"Error processing {result['file']}: {result['error']}")
+                    stats["failed"] += 1
+                    continue
+                stat, content_fingerprint = to_extract[result["file"]]
+                self._store(result["file"], stat, content_fingerprint, result["activities"])
+                stats["indexed"] += 1
+
+        directory = os.path.abspath(directory)
+        for path in known:
+            if os.path.dirname(path) == directory and path not in seen:
+                self._remove(path)
+                stats["removed"] += 1
+
+        if not stats["failed"]:
+            # Documents that failed are retried with the new categories on the next update.
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('categories', ?)",
+                                    (lookup_fingerprint,))
+        self.connection.commit()
+        for outcome, count in stats.items():
+            instrumentation.increment("activity_index_documents_total", count, result=outcome)
+        return stats
+
+    def query(self, category=None, since=None, until=None, text=None, limit=None, match=None):
+        """
+        Search the indexed activities.
+
+        Parameters:
+        category (str): Only activities of this category (optional).
+        since (str): Only reports dated on or after this ISO date (optional).
+        until (str): Only reports dated on or before this ISO date (optional).
+        text (str): Words that must all appear in the activity, e.g. "react hooks" or "node.js" (optional).
+        limit (int): The maximum number of results (optional).
+        match (str): A raw FTS5 query, e.g. "react AND (hooks OR redux)" (optional, needs FTS5).
+
+        Returns:
+        list: (report_date, document_path, category, text) tuples, oldest report first.
+        """
+        conditions, parameters = [], []
+        if category:
+            conditions.append("a.category = ?")
+            parameters.append(category)
+        if since:
+            conditions.append("d.report_date >= ?")
+            parameters.append(since)
+        if until:
+            conditions.append("d.report_date <= ?")
+            parameters.append(until)
+        if match and not self.full_text:
+            raise ValueError("Full-text queries need SQLite built with FTS5; search with text instead.")
+        if text and self.full_text:
+            match = f"({match}) {match_terms(text)}" if match else match_terms(text)
+        elif text:
+            for word in text.split():
+                conditions.append("a.text LIKE ?")
+                parameters.append(f"%{word}%")
+        if match:
+            conditions.append("a.id IN (SELECT rowid FROM activities_fts WHERE activities_fts MATCH ?)")
+            parameters.append(match)
+
+        sql = ("SELECT d.report_date, d.path, a.category, a.text FROM activities a "
+               "JOIN documents d ON d.path = a.document_path")
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY d.report_date, d.path, a.position"
+        if limit:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        return self.connection.execute(sql, parameters).fetchall()
+
+    def _store(self, path, stat, content_fingerprint, activities):
+        self._remove(path)
+        self.connection.execute(
+            "INSERT INTO documents (path, size, mtime_ns, fingerprint, report_date) VALUES (?, ?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, content_fingerprint, report_date(path, stat.st_mtime_ns)))
+        position = 0
+        for category, texts in activities.items():
+            for text in texts:
+                cursor = self.connection.execute(
+                    "INSERT INTO activities (document_path, category, position, text) VALUES (?, ?, ?, ?)",
+                    (path, category, position, text))
+                if self.full_text:
+                    self.connection.execute("INSERT INTO activities_fts (rowid, text) VALUES (?, ?)",
+                                            (cursor.lastrowid, text))
+                position += 1
+
+    def _remove(self, path):
+        if self.full_text:
+            # An external-content FTS table must be told the exact rows it forgets.
+            self.connection.execute(
+                "INSERT INTO activities_fts (activities_fts, rowid, text) "
+                "SELECT 'delete', id, text FROM activities WHERE document_path = ?", (path,))
+        self.connection.execute("DELETE FROM activities WHERE document_path = ?", (path,))
+        self.connection.execute("DELETE FROM documents WHERE path = ?", (path,))
+
+
+if __name__ == "__main__":
+    instrumentation.main_session()
+    parser = argparse.ArgumentParser(description="Index and search the activities of weekly Word reports.")
+    parser.add_argument("--db", default="activities.db", help="The index database (default is 'activities.db').")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    update_parser = commands.add_parser("update", help="Index new and changed documents of a directory.")
+    update_parser.add_argument("directory", help="The directory holding the .docx files.")
+    update_parser.add_argument("--categories", default=None,
+                               help="A JSON file listing the categories (see data/categories.json).")
+    update_parser.add_argument("--workers", type=int, default=None,
+                               help="The number of extraction processes (default is the CPU count).")
+
+    query_parser = commands.add_parser("query", help="Search the indexed activities.")
+    query_parser.add_argument("--category", help="Only activities of this category.")
+    query_parser.add_argument("--since", help="Only reports dated on or after this date (YYYY-MM-DD).")
+    query_parser.add_argument("--until", help="Only reports dated on or before this date (YYYY-MM-DD).")
+    query_parser.add_argument("--text", help="Words that must all appear in the activity.")
+    query_parser.add_argument("--match", help="A raw FTS5 query, e.g. 'react AND (hooks OR redux)'.")
+    query_parser.add_argument("--limit", type=int, default=None, help="The maximum number of results.")
+    args = parser.parse_args()
+
+    index = ActivityIndex(args.db)
+    if args.command == "update":
+        result = index.update(args.directory, args.categories, args.workers)
+        print(f"Indexed {result['indexed']}, unchanged {result['unchanged']}, "
+              f"removed {result['removed']}, failed {result['failed']}.")
+    else:
+        try:
+            results = index.query(args.category, args.since, args.until, args.text, args.limit, args.match)
+        except (ValueError, sqlite3.OperationalError) as e:
+            print(f"Invalid query: {e}")
+            sys.exit(1)
+        for report, path, category, text in results:
+            print(f"{report}  {category:<16}  {text}  ({os.path.basename(path)})")
@@ -0,0 +1,75 @@
+########################################################################################################################
+# Activity Extraction Helpers                                                                                          #
+#                                                                                                                      #
+# This module holds the category configuration and the single-pass extraction of activities from a Word document,     #
+# shared by `field-extraction.py` and `activityindex.py`. They live in an importable module so that worker processes   #
+# can unpickle them.                                                                                                   #
+#                                                                                                                      #
+# Dependencies:                                                                                                        #
+#    - python-docx: `pip install python-docx`                                                                          #
+########################################################################################################################
+
+from docx import Document
+import json
+
+
+DEFAULT_CATEGORIES = ["Learning", "Reading", "Writing",
+                      "Job Applications", "Interview Prep", "Travel/Visit"]
+
+
+def load_categories(config_path=None):
+    """
+    Load the activity categories and the paragraph prefixes that map to them.
+
+    Parameters:
+    config_path (str): A JSON file holding either a list of category names, each being its own
+                       prefix, or an object mapping each category to a list of prefixes (optional,
+                       defaults to the built-in categories).
+
+    Returns:
+    dict: The prefix (text before the first colon) -> category lookup table.
+    """
+    categories = DEFAULT_CATEGORIES
+    if config_path:
+        with open(config_path, encoding="utf-8") as config_file:
+            categories = json.load(config_file)
+
+    if isinstance(categories, dict):
+        return {prefix: category for category, prefixes in categories.items() for prefix in prefixes}
+    return {category: category for category in categories}
+
+
+def extract_activities(file_path, lookup):
+    """
+    Extract the categorized activities of a Word document in a single pass over its paragraphs.
+
+    Each paragraph is split on its first colon and the text before it is looked up in `lookup`,
+    instead of testing every category prefix in turn.
+
+    Parameters:
+    file_path (str): The Word document.
+    lookup (dict): The prefix -> category table from `load_categories`.
+
+    Returns:
+    dict: The activities of each category, including empty categories.
+    """
+    activities = {category: [] for category in dict.fromkeys(lookup.values())}
+    document = Document(file_path)
+
+    for paragraph in document.paragraphs:
+        prefix, separator, activity = paragraph.text.strip().partition(":")
+        if separator:
+            category = lookup.get(prefix)
+            if category is not None:
+                activities[category].append(activity.strip())
+
+    return activities
+
+
+def extract_document(arguments):
+    # Runs in a worker process; errors are returned so one bad file does not stop the batch.
+    file_path, lookup = arguments
+    try:
+        return {"file": file_path, "activities": extract_activities(file_path, lookup)}
+    except Exception as e:
+        return {"file": file_path, "error": str(e)}
@@ -2,7 +2,7 @@
 # Document Processing Class                                                                                            #
 #                                                                                                                      #
 # This class processes a Word document specified in the `file_path` and extracts categorized activities into a JSON    #
-# file.                                                                                                                #
+# file. A directory of Word documents can also be processed in parallel, with one JSON line per document.             #
 #                                                                                                                      #
 # Author: Renel Lherisson                                                                                              #
 # Date: 2024-12-27                                                                                                     #
@@ -11,48 +11,34 @@
 #    - python-docx: `pip install python-docx`                                                                          #
 ########################################################################################################################
 
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
+import argparse
 import json
+import os
+import sys
+
+from extraction import extract_activities, extract_document, load_categories
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
 
 
 class DocumentProcessor:
-    def __init__(self, file_path, output_file_path):
+    def __init__(self, file_path, output_file_path, categories_path=None):
         self.file_path = file_path
         self.output_file_path = output_file_path
-        self.activities = {
-            "Learning": [],
-            "Reading": [],
-            "Writing": [],
-            "Job Applications": [],
-            "Interview Prep": [],
-            "Travel/Visit": []
-        }
+        self.lookup = load_categories(categories_path)
+        self.activities = {category: []
+                           for category in dict.fromkeys(self.lookup.values())}
 
     def process_document(self):
-        # Load the Word document
-        document = Document(self.file_path)
-
         # Extract text and categorize into the dictionary
-        for paragraph in document.paragraphs:
-            text = paragraph.text.strip()
-            if text.startswith("Learning:"):
-                self.activities["Learning"].append(
-                    text.replace("Learning:", "").strip())
-            elif text.startswith("Reading:"):
-                self.activities["Reading"].append(
-                    text.replace("Reading:", "").strip())
-            elif text.startswith("Writing:"):
-                self.activities["Writing"].append(
-                    text.replace("Writing:", "").strip())
-            elif text.startswith("Job Applications:"):
-                self.activities["Job Applications"].append(
-                    text.replace("Job Applications:", "").strip())
-            elif text.startswith("Interview Prep:"):
-                self.activities["Interview Prep"].append(
-                    text.replace("Interview Prep:", "").strip())
-            elif text.startswith("Travel/Visit:"):
-                self.activities["Travel/Visit"].append(
-                    text.replace("Travel/Visit:", "").strip())
+        with instrumentation.span("extraction_seconds"):
+            extracted = extract_activities(self.file_path, self.lookup)
+        for category, activities in extracted.items():
+            self.activities[category].extend(activities)
+            instrumentation.increment("extraction_activities_total", len(activities), category=category)
 
     def save_to_json(self):
         # Convert the dictionary to JSON
@@ -67,12 +53,65 @@ class DocumentProcessor:
         self.save_to_json()
         return self.output_file_path
 
+    def process_directory(self, directory, workers=None, chunksize=4):
+        """
+        Extract the activities of every Word document in a directory across a process pool,
+        streaming one JSON line per document to the output file as results come in.
+
+        Parameters:
+        directory (str): The directory holding the .docx files.
+        workers (int): The number of worker processes (optional, defaults to the CPU count).
+        chunksize (int): The number of documents sent to a worker at once (default is 4).
+
+        Returns:
+        tuple: The number of documents processed and the number that failed.
+        """
+        file_paths = sorted(entry.path for entry in os.scandir(directory)
+                            if entry.is_file() and entry.name.lower().endswith(".docx")
+                            and not entry.name.startswith("~$"))
+        processed = failed = 0
+
+        with instrumentation.span("extraction_batch_seconds"), ProcessPoolExecutor(max_workers=workers) as executor, \
+                open(self.output_file_path, "w", encoding="utf-8") as output_file:
+            results = executor.map(extract_document,
+                                   ((file_path, self.lookup) for file_path in file_paths),
+                                   chunksize=chunksize)
+            for result in results:
+                output_file.write(json.dumps(result) + "\n")
+                processed += 1
+                if "error" in result:
+                    failed += 1
+                    instrumentation.increment("extraction_documents_total", result="failed")
+                    print(f"Error processing {result['file']}: {result['error']}")
+                else:
+                    instrumentation.increment("extraction_documents_total", result="extracted")
+
+        return processed, failed
+
 
 # Example usage
 if __name__ == "__main__":
-    file_path = './data/52.docx'
-    output_file_path = './data/activities.json'
+    instrumentation.main_session()
+    parser = argparse.ArgumentParser(
+        description="Extract categorized activities from a Word document, or from every Word document in a directory.")
+    parser.add_argument("path", nargs="?", default="./data/52.docx",
+                        help="A .docx file, or a directory of .docx files (default is './data/52.docx').")
+    parser.add_argument("--output", default=None,
+                        help="The output file: JSON for a document, JSON Lines for a directory "
+                             "(default is './data/activities.json' or './data/activities.jsonl').")
+    parser.add_argument("--categories", default=None,
+                        help="A JSON file listing the categories (see data/categories.json).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="The number of worker processes for a directory (default is the CPU count).")
+    args = parser.parse_args()
 
-    processor = DocumentProcessor(file_path, output_file_path)
-    result_path = processor.run()
-    print(f"Activities JSON saved to: {result_path}")
+    if os.path.isdir(args.path):
+        output_file_path = args.output or './data/activities.jsonl'
+        processor = DocumentProcessor(None, output_file_path, args.categories)
+        processed, failed = processor.process_directory(args.path, args.workers)
+        print(f"Processed {processed} documents ({failed} failed), results saved to: {output_file_path}")
+    else:
+        output_file_path = args.output or './data/activities.json'
+        processor = DocumentProcessor(args.path, output_file_path, args.categories)
+        result_path = processor.run()
+        print(f"Activities JSON saved to: {result_path}")
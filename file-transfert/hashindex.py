@@ -0,0 +1,201 @@
+########################################################################################################################
+# Destination Hash Index                                                                                               #
+#                                                                                                                      #
+# This module keeps a persistent index of the files in a destination folder so that `move.py` can detect files whose   #
+# content is already present there. Entries are invalidated when a file's size or modification time changes.          #
+#                                                                                                                      #
+# Files are compared cheaply first: by size, then by a partial hash of their head and tail. Only files whose size and  #
+# partial hash both collide are fully hashed.                                                                          #
+########################################################################################################################
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+INDEX_NAME = ".mover-index.json"
+PARTIAL_BLOCK_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+class HashIndex:
+    def __init__(self, root: str, index_path: str = None, ignore=()):
+        """
+        Initialize the index for the given destination folder.
+
+        Parameters:
+        root (str): The destination folder to index.
+        index_path (str): Where to persist the index (optional, defaults to `<root>/.mover-index.json`).
+        ignore (iterable): File names to leave out of the index, such as journals.
+        """
+        self.root = os.path.abspath(root)
+        self.index_path = index_path or os.path.join(self.root, INDEX_NAME)
+        self.ignore = set(ignore) | {os.path.basename(self.index_path)}
+        self.entries = {}
+        self.by_size = defaultdict(list)
+        self.pending = {}
+        self._hashes = {}
+        self.full_hashes = 0
+        self.partial_hashes = 0
+
+    def load(self):
+        """
+        Load the persisted index and reconcile it with the destination folder.
+
+        Every file in the folder is stat'ed, but none is read: entries whose size or
+        modification time no longer match are dropped and rehashed only when needed.
+
+        Returns:
+        HashIndex: The index itself, to allow chaining.
+        """
+        stored = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, encoding="utf-8") as index_file:
+                    stored = json.load(index_file)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Ignoring unreadable index {self.index_path}: {e}")
+
+        for path, stat in self._scan(self.root):
+            relative_path = os.path.relpath(path, self.root)
+            entry = stored.get(relative_path)
+            if not entry or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime_ns:
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+            self.entries[path] = entry
+            self.by_size[stat.st_size].append((path, path))
+
+        return self
+
+    def find_duplicate(self, path: str):
+        """
+        Find a file with the same content as `path` in the destination folder.
+
+        Parameters:
+        path (str): The file to look for.
+
+        Returns:
+        str: The destination path holding the same content, or None if there is none.
+        """
+        size = os.path.getsize(path)
+        candidates = self.by_size.get(size)
+        if not candidates:
+            return None
+
+        partial = self._digest(path, "partial")
+        for read_path, dest_path in candidates:
+            if read_path == path:
+                continue
+            try:
+                if self._digest(read_path, "partial") != partial:
+                    continue
+                if self._digest(read_path, "full") == self._digest(path, "full"):
+                    return dest_path
+            except FileNotFoundError:
+                # Removed from the destination since it was indexed.
+                continue
+
+        return None
+
+    def add(self, src: str, dest_path: str):
+        """
+        Register a file that is about to be moved into the destination folder, so that
+        later files in the same batch are compared against it too.
+
+        Parameters:
+        src (str): The current location of the file.
+        dest_path (str): The location the file will be moved to.
+
+        Returns:
+        None
+        """
+        self.by_size[os.path.getsize(src)].append((src, dest_path))
+        self.pending[dest_path] = src
+
+    def save(self):
+        """
+        Persist the index, carrying over the hashes of files moved in during this run.
+
+        Files registered with `add` are re-keyed on their destination path, since their source
+        path no longer exists, so the same index can be used again for the next batch.
+
+        Returns:
+        None
+        """
+        self._settle()
+        entries = {}
+        for path, entry in self.entries.items():
+            if os.path.exists(path):
+                entries[os.path.relpath(path, self.root)] = entry
+
+        temp_path = f"{self.index_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as index_file:
+            json.dump(entries, index_file)
+        os.replace(temp_path, self.index_path)
+
+    def _settle(self):
+        for dest_path, src in self.pending.items():
+            if os.path.exists(dest_path):
+                stat = os.stat(dest_path)
+                entry = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+                entry.update(self._hashes.get(src, {}))
+                self.entries[dest_path] = entry
+
+        for size, candidates in self.by_size.items():
+            settled = []
+            for read_path, dest_path in candidates:
+                if self.pending.get(dest_path) == read_path:
+                    if dest_path not in self.entries:
+                        # The move failed: the file is not in the destination.
+                        continue
+                    read_path = dest_path
+                settled.append((read_path, dest_path))
+            self.by_size[size] = settled
+
+        self.pending = {}
+        # Hashes of source files may be stale by the next batch.
+        self._hashes = {}
+
+    def _scan(self, folder):
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._scan(entry.path)
+                elif entry.is_file(follow_symlinks=False) and entry.name not in self.ignore:
+                    yield entry.path, entry.stat(follow_symlinks=False)
+
+    def _digest(self, path, kind):
+        hashes = self.entries.get(path)
+        if hashes is None:
+            hashes = self._hashes.setdefault(path, {})
+
+        if kind not in hashes:
+            if kind == "partial":
+                hashes[kind] = self._partial_hash(path)
+                self.partial_hashes += 1
+            else:
+                hashes[kind] = self._full_hash(path)
+                self.full_hashes += 1
+
+        return hashes[kind]
+
+    def _partial_hash(self, path):
+        digest = hashlib.blake2b()
+        with open(path, "rb") as f:
+            digest.update(f.read(PARTIAL_BLOCK_SIZE))
+            size = os.fstat(f.fileno()).st_size
+            if size > 2 * PARTIAL_BLOCK_SIZE:
+                f.seek(-PARTIAL_BLOCK_SIZE, os.SEEK_END)
+                digest.update(f.read(PARTIAL_BLOCK_SIZE))
+            elif size > PARTIAL_BLOCK_SIZE:
+                digest.update(f.read())
+        return digest.hexdigest()
+
+    def _full_hash(self, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+        return digest.hexdigest()
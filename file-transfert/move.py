@@ -1,20 +1,53 @@
 import argparse
+import json
 import os
+import sys
+import time
+
+from hashindex import HashIndex, INDEX_NAME
+
+# Shared modules (instrumentation, watcher) live at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
+COLLISION_POLICIES = ("suffix", "skip", "subdir")
+DEDUP_MODES = ("skip", "link")
+JOURNAL_NAME = ".mover-journal.jsonl"
 
 
 class Mover:
-    def __init__(self, file_src_abs_path: str, file_dst_abs_path: str, file_type: str = "pdf"):
+    def __init__(self, file_src_abs_path: str, file_dst_abs_path: str, file_type: str = "pdf",
+                 on_collision: str = "suffix", journal_path: str = None, dedup: str = None,
+                 index_path: str = None):
         self.file_src_abs_path = file_src_abs_path
         self.file_dst_abs_path = file_dst_abs_path
         self.file_type = file_type.lower()
+        self.on_collision = on_collision
+        self.journal_path = journal_path
+        self.dedup = dedup
+        self.index_path = index_path
+        self.index = None
         self.files = []
+        self.plan = []
         self.moved_files = []
+        self.skipped_files = []
         self.unsuccessful_files = []
 
+        if self.on_collision not in COLLISION_POLICIES:
+            raise ValueError(
+                f"Unknown collision policy '{on_collision}'. Choose one of {', '.join(COLLISION_POLICIES)}.")
+        if self.dedup is not None and self.dedup not in DEDUP_MODES:
+            raise ValueError(
+                f"Unknown dedup mode '{dedup}'. Choose one of {', '.join(DEDUP_MODES)}.")
+
     def move_files(self, src_folder: str, dest_folder: str, file_type: str):
         """
         Move files from a source directory to a destination directory.
 
+        The move is planned upfront and every committed move is appended to a journal
+        in the destination folder. If an unfinished batch for the same source, destination
+        and file type is found in the journal, it is resumed instead of rescanning the source.
+
         Parameters:
         src_folder (str): The source folder where the files are located.
         dest_folder (str): The destination folder where the files will be moved.
@@ -30,9 +63,144 @@ class Mover:
         if not self._validate_paths():
             return
 
+        batch = self._unfinished_batch()
+        if batch is not None:
+            print(f"Resuming batch {batch['batch']} from {self._journal()}")
+            self.plan = batch["moves"]
+            self.skipped_files = batch["skipped"]
+            self._execute_plan(batch["batch"], batch["done"])
+            return
+
         self._collect_files()
         self._move_collected_files()
 
+    def watch(self, src_folder: str, dest_folder: str, file_type: str, debounce: float = 2.0,
+              poll_interval: float = 30.0):
+        """
+        Move the files already in the source directory, then keep watching it and move
+        new files as soon as they are completely written.
+
+        Parameters:
+        src_folder (str): The source folder to watch.
+        dest_folder (str): The destination folder where the files will be moved.
+        file_type (str): The file type to move.
+        debounce (float): Seconds a file must stay untouched before it is moved.
+        poll_interval (float): Seconds between scans if inotify cannot be used.
+
+        Returns:
+        None
+        """
+        self.file_src_abs_path = os.path.abspath(src_folder)
+        self.file_dst_abs_path = os.path.abspath(dest_folder)
+        # Set before looking for an unfinished batch, which is matched on the file type too.
+        self.file_type = file_type.lower()
+        if not self._validate_paths():
+            return
+
+        if self._unfinished_batch() is not None:
+            self.move_files(src_folder, dest_folder, file_type)
+        self.move_files(src_folder, dest_folder, file_type)
+
+        # Only loaded in watch mode.
+        from watcher import Watcher
+
+        watcher = Watcher(self.file_src_abs_path, self._move_ready_files,
+                          debounce=debounce, poll_interval=poll_interval, ignore=self._is_ignored)
+        print(f"Watching {self.file_src_abs_path} (press Ctrl+C to stop)...")
+        watcher.run()
+
+    def plan_moves(self):
+        """
+        Build the list of moves for the collected files, resolving name collisions.
+
+        A collision happens when the destination already holds a file with the same name,
+        or when two source files from different subfolders share a name. It is resolved
+        according to `on_collision`:
+            - "suffix": append `_1`, `_2`, ... to the file name.
+            - "skip": leave the file in the source folder.
+            - "subdir": keep the file's path relative to the source folder.
+
+        When `dedup` is set, files whose content already exists in the destination are
+        either left in place ("skip") or hard-linked to the existing copy ("link").
+
+        Returns:
+        list: A list of [source, destination] pairs, with the existing copy to link to
+              as a third item for hard-linked files.
+        """
+        self.plan = []
+        taken = set()
+
+        for file in sorted(self.files):
+            new_file_path = os.path.join(
+                self.file_dst_abs_path, os.path.basename(file))
+
+            duplicate = self.index.find_duplicate(file) if self.index else None
+            if duplicate and (self.dedup == "skip" or duplicate == new_file_path):
+                self.skipped_files.append(file)
+                print(f"Skipping (duplicate of {duplicate}): {file}")
+                continue
+
+            if self._is_taken(new_file_path, taken):
+                if self.on_collision == "skip":
+                    self.skipped_files.append(file)
+                    print(f"Skipping (name collision): {file}")
+                    continue
+                if self.on_collision == "subdir":
+                    new_file_path = os.path.join(
+                        self.file_dst_abs_path, os.path.relpath(file, self.file_src_abs_path))
+                if self._is_taken(new_file_path, taken) or self.on_collision == "suffix":
+                    new_file_path = self._with_free_suffix(
+                        new_file_path, taken)
+
+            taken.add(new_file_path)
+            if duplicate:
+                self.plan.append([file, new_file_path, duplicate])
+            else:
+                self.plan.append([file, new_file_path])
+            if self.index:
+                self.index.add(file, new_file_path)
+
+        return self.plan
+
+    def undo(self, dest_folder: str = None):
+        """
+        Undo the last completed batch recorded in the journal by moving files back.
+
+        Parameters:
+        dest_folder (str): The destination folder of the batch (optional, defaults to
+                           the current destination folder).
+
+        Returns:
+        None
+        """
+        if dest_folder:
+            self.file_dst_abs_path = os.path.abspath(dest_folder)
+
+        batches = self._read_journal()
+        done_batches = [b for b in batches.values()
+                        if b["ended"] and not b["undone"]]
+        if not done_batches:
+            print("Nothing to undo.")
+            return
+
+        batch = done_batches[-1]
+        with open(self._journal(), "a", encoding="utf-8") as journal:
+            for index in sorted(batch["done"], reverse=True):
+                src, dst = batch["moves"][index][:2]
+                try:
+                    # A new file may have appeared at the source since the move; never replace it.
+                    if os.path.exists(src):
+                        raise FileExistsError(f"Source already exists: {src}")
+                    os.makedirs(os.path.dirname(src), exist_ok=True)
+                    os.rename(dst, src)
+                    self.moved_files.append(dst)
+                    print(f"Restored: {dst} -> {src}")
+                except Exception as e:
+                    self.unsuccessful_files.append(dst)
+                    print(f"Error restoring {dst}: {e}")
+            self._append(journal, {"op": "undo", "batch": batch["batch"]})
+        self._compact_journal()
+
     def _validate_paths(self):
         if not os.path.exists(self.file_src_abs_path):
             print(
@@ -47,25 +215,184 @@ class Mover:
         return True
 
     def _collect_files(self):
+        self.files = []
         for root, _, files in os.walk(self.file_src_abs_path):
-            if self.file_type == "all":
-                self.files.extend([os.path.join(root, file) for file in files])
-            else:
-                for file in files:
-                    if file.lower().endswith(f".{self.file_type}"):
-                        self.files.append(os.path.join(root, file))
+            for file in files:
+                if self._matches(file):
+                    self.files.append(os.path.join(root, file))
+
+    def _matches(self, file_name):
+        if file_name in (JOURNAL_NAME, INDEX_NAME):
+            return False
+        return self.file_type == "all" or file_name.lower().endswith(f".{self.file_type}")
+
+    def _is_ignored(self, path):
+        return not self._matches(os.path.basename(path)) or \
+            path.startswith(self.file_dst_abs_path + os.sep)
 
     def _move_collected_files(self):
-        for file in self.files:
-            file_name = os.path.basename(file)
-            new_file_path = os.path.join(self.file_dst_abs_path, file_name)
-            try:
-                os.rename(file, new_file_path)
-                self.moved_files.append(file)
-                print(f"Moved: {file} -> {new_file_path}")
-            except Exception as e:
-                self.unsuccessful_files.append(file)
-                print(f"Error moving {file}: {e}")
+        if self.dedup and self.index is None:
+            self.index = HashIndex(self.file_dst_abs_path, self.index_path,
+                                   ignore=(JOURNAL_NAME,)).load()
+        with instrumentation.span("mover_plan_seconds"):
+            self.plan_moves()
+        instrumentation.increment("mover_files_planned_total", len(self.plan))
+        if self.plan:
+            batch_id = self._start_batch()
+            self._execute_plan(batch_id, set())
+        else:
+            print("Nothing to move.")
+        if self.index:
+            self.index.save()
+
+    def _move_ready_files(self, paths):
+        self.files = paths
+        self._move_collected_files()
+
+    def _is_taken(self, path, taken):
+        return path in taken or os.path.exists(path)
+
+    def _with_free_suffix(self, path, taken):
+        base, extension = os.path.splitext(path)
+        counter = 1
+        while self._is_taken(f"{base}_{counter}{extension}", taken):
+            counter += 1
+        return f"{base}_{counter}{extension}"
+
+    def _execute_plan(self, batch_id, done):
+        with open(self._journal(), "a", encoding="utf-8") as journal:
+            for index, (file, new_file_path, *duplicate) in enumerate(self.plan):
+                if index in done:
+                    continue
+
+                # A crash between the rename and the journal write leaves the file
+                # already in place; record it instead of reporting an error.
+                if not os.path.exists(file) and os.path.exists(new_file_path):
+                    self._append(journal, {"op": "move", "batch": batch_id,
+                                           "index": index})
+                    self.moved_files.append(file)
+                    instrumentation.increment("mover_files_total", result="recovered")
+                    continue
+                # Likewise for a crash between the link and the removal of the source.
+                if duplicate and os.path.exists(file) and os.path.exists(new_file_path) \
+                        and os.path.samefile(new_file_path, duplicate[0]):
+                    os.remove(file)
+                    self._append(journal, {"op": "move", "batch": batch_id,
+                                           "index": index})
+                    self.moved_files.append(file)
+                    instrumentation.increment("mover_files_total", result="recovered")
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    if os.path.exists(new_file_path):
+                        raise FileExistsError(
+                            f"Destination already exists: {new_file_path}")
+                    os.makedirs(os.path.dirname(new_file_path), exist_ok=True)
+                    if duplicate:
+                        os.link(duplicate[0], new_file_path)
+                        os.remove(file)
+                        print(f"Linked: {file} -> {new_file_path} (same as {duplicate[0]})")
+                    else:
+                        os.rename(file, new_file_path)
+                        print(f"Moved: {file} -> {new_file_path}")
+                    self._append(journal, {"op": "move", "batch": batch_id,
+                                           "index": index})
+                    self.moved_files.append(file)
+                    result = "linked" if duplicate else "moved"
+                except Exception as e:
+                    self.unsuccessful_files.append(file)
+                    print(f"Error moving {file}: {e}")
+                    result = "failed"
+                # Includes the journal fsync, which usually dominates a same-device move.
+                instrumentation.observe("mover_move_seconds", time.perf_counter() - start)
+                instrumentation.increment("mover_files_total", result=result)
+
+            self._append(journal, {"op": "end", "batch": batch_id})
+        self._compact_journal()
+
+    def _journal(self):
+        return self.journal_path or os.path.join(self.file_dst_abs_path, JOURNAL_NAME)
+
+    def _append(self, journal, entry):
+        journal.write(json.dumps(entry) + "\n")
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    def _start_batch(self):
+        # Random suffix: a watching process can start several batches within a second.
+        batch_id = time.strftime("%Y%m%d%H%M%S") + f"-{os.getpid()}-{os.urandom(3).hex()}"
+        with open(self._journal(), "a", encoding="utf-8") as journal:
+            self._append(journal, {
+                "op": "plan",
+                "batch": batch_id,
+                "src": self.file_src_abs_path,
+                "dst": self.file_dst_abs_path,
+                "type": self.file_type,
+                "moves": self.plan,
+                "skipped": self.skipped_files,
+            })
+        return batch_id
+
+    def _read_journal(self):
+        batches = {}
+        if not os.path.exists(self._journal()):
+            return batches
+
+        with open(self._journal(), encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn write from a crash; nothing after it was committed.
+                    break
+
+                if entry["op"] == "plan":
+                    batches[entry["batch"]] = dict(
+                        entry, done=set(), ended=False, undone=False)
+                    continue
+
+                batch = batches.get(entry["batch"])
+                if batch is None:
+                    continue
+                if entry["op"] == "move":
+                    batch["done"].add(entry["index"])
+                elif entry["op"] == "end":
+                    batch["ended"] = True
+                elif entry["op"] == "undo":
+                    batch["undone"] = True
+
+        return batches
+
+    def _compact_journal(self):
+        # Only unfinished batches (to resume them) and the last completed one (to undo it) are kept,
+        # so the journal does not grow with every run.
+        batches = list(self._read_journal().values())
+        completed = [batch for batch in batches if batch["ended"] and not batch["undone"]]
+        kept = [batch for batch in batches
+                if not batch["ended"] or (completed and batch is completed[-1])]
+        if len(kept) == len(batches):
+            return
+
+        temp_path = f"{self._journal()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as journal:
+            for batch in kept:
+                journal.write(json.dumps({key: value for key, value in batch.items()
+                                          if key not in ("done", "ended", "undone")}) + "\n")
+                for index in sorted(batch["done"]):
+                    journal.write(json.dumps({"op": "move", "batch": batch["batch"], "index": index}) + "\n")
+                if batch["ended"]:
+                    journal.write(json.dumps({"op": "end", "batch": batch["batch"]}) + "\n")
+            journal.flush()
+            os.fsync(journal.fileno())
+        os.replace(temp_path, self._journal())
+
+    def _unfinished_batch(self):
+        for batch in reversed(list(self._read_journal().values())):
+            if (not batch["ended"] and batch["src"] == self.file_src_abs_path
+                    and batch["dst"] == self.file_dst_abs_path and batch["type"] == self.file_type):
+                return batch
+        return None
 
     def summary(self):
         """
@@ -76,7 +403,11 @@ class Mover:
         """
         print("\nSummary:")
         print(f"Total files moved: {len(self.moved_files)}")
+        print(f"Total files skipped: {len(self.skipped_files)}")
         print(f"Total files not moved: {len(self.unsuccessful_files)}")
+        if self.index:
+            print(f"Files hashed: {self.index.partial_hashes} partially, "
+                  f"{self.index.full_hashes} fully")
         if self.unsuccessful_files:
             print("Unsuccessful files:")
             for file in self.unsuccessful_files:
@@ -84,6 +415,7 @@ class Mover:
 
 
 if __name__ == "__main__":
+    instrumentation.main_session()
     parser = argparse.ArgumentParser(
         description="Move files from a source directory to a destination directory.")
     parser.add_argument("src", type=str,
@@ -92,8 +424,31 @@ if __name__ == "__main__":
                         help="The destination folder where the files will be moved.")
     parser.add_argument("--type", type=str, default="pdf",
                         help="The file type to move. Use 'all' to move all files. Default is 'pdf'.")
+    parser.add_argument("--on-collision", choices=COLLISION_POLICIES, default="suffix",
+                        help="What to do when a file name already exists in the destination. Default is 'suffix'.")
+    parser.add_argument("--journal", type=str, default=None,
+                        help=f"Path of the move journal. Default is '<dest>/{JOURNAL_NAME}'.")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default=None,
+                        help="Skip or hard-link files whose content already exists in the destination.")
+    parser.add_argument("--index", type=str, default=None,
+                        help=f"Path of the destination hash index. Default is '<dest>/{INDEX_NAME}'.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and move new files as they arrive in the source folder.")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="Seconds a file must stay untouched before it is moved in watch mode. Default is 2.")
+    parser.add_argument("--poll-interval", type=float, default=30.0,
+                        help="Seconds between scans when inotify is unavailable in watch mode. Default is 30.")
+    parser.add_argument("--undo", action="store_true",
+                        help="Undo the last completed batch moved into the destination.")
     args = parser.parse_args()
 
-    mover = Mover("", "")
-    mover.move_files(args.src, args.dest, args.type)
+    mover = Mover("", "", on_collision=args.on_collision,
+                  journal_path=args.journal, dedup=args.dedup, index_path=args.index)
+    if args.undo:
+        mover.undo(args.dest)
+    elif args.watch:
+        mover.watch(args.src, args.dest, args.type,
+                    debounce=args.debounce, poll_interval=args.poll_interval)
+    else:
+        mover.move_files(args.src, args.dest, args.type)
     mover.summary()
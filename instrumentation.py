@@ -0,0 +1,338 @@
+########################################################################################################################
+# Instrumentation                                                                                                      #
+#                                                                                                                      #
+# This module collects counters, gauges and histograms from the hot paths of the scripts (word counting, extraction,  #
+# downloads, moves, renames, sends) and exports them as JSON or in the Prometheus text format. Spans time a block of  #
+# code into a histogram. Recording is always on and cheap (a lock and a dictionary update); nothing is written unless #
+# asked for.                                                                                                           #
+#                                                                                                                      #
+# Any script can be run under cProfile and/or tracemalloc and have its metrics saved, without changing its code:      #
+#    python boring-tasks.py --metrics metrics.prom --profile run.prof --trace-memory move <arguments>                  #
+#    python instrumentation.py --metrics metrics.json file-transfert/move.py <arguments>                               #
+#    python file-transfert/move.py --metrics metrics.json <arguments>                                                  #
+# or by setting BORING_TASKS_METRICS, BORING_TASKS_PROFILE and BORING_TASKS_TRACEMALLOC=1.                             #
+# A metrics path ending in .json is written as JSON, anything else in the Prometheus text format.                     #
+########################################################################################################################
+
+import atexit
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+
+    def increment(self, name, value=1, **labels):
+        """
+        Add to a counter.
+
+        Parameters:
+        name (str): The counter name, by convention ending in "_total".
+        value (float): The amount to add (default is 1).
+        **labels: Label values distinguishing series of the same counter, e.g. result="failed".
+
+        Returns:
+        None
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._gauges[key] = value
+
+    def observe(self, name, value, **labels):
+        """
+        Record a value, usually a duration in seconds, in a histogram.
+
+        Parameters:
+        name (str): The histogram name, by convention ending in "_seconds".
+        value (float): The value to record.
+        **labels: Label values distinguishing series of the same histogram.
+
+        Returns:
+        None
+        """
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        """
+        Time a block of code into the `name` histogram, whether it returns or raises.
+
+        Usage:
+        with metrics.span("mover_move_seconds"):
+            shutil.move(src, dst)
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """
+        Copy the current values of every metric.
+
+        Returns:
+        dict: "counters" and "gauges" as lists of {name, labels, value}, and "histograms" as lists of
+              {name, labels, count, sum, min, max, buckets}, where buckets maps each upper bound
+              to the cumulative number of values below it.
+        """
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            gauges = [{"name": name, "labels": dict(labels), "value": value}
+                      for (name, labels), value in sorted(self._gauges.items())]
+            histograms = []
+            for (name, labels), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                cumulative, buckets = 0, {}
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                buckets["+Inf"] = histogram.count
+                histograms.append({"name": name, "labels": dict(labels), "count": histogram.count,
+                                   "sum": histogram.sum, "min": histogram.min, "max": histogram.max,
+                                   "buckets": buckets})
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+    def to_json(self):
+        import json
+
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+        str: The metrics, one "# TYPE" header per metric name.
+        """
+        snapshot = self.snapshot()
+        lines = []
+        for kind in ("counters", "gauges"):
+            declared = set()
+            for metric in snapshot[kind]:
+                if metric["name"] not in declared:
+                    declared.add(metric["name"])
+                    lines.append(f"# TYPE {metric['name']} {kind[:-1]}")
+                lines.append(f"{metric['name']}{_format_labels(metric['labels'])} {metric['value']}")
+
+        declared = set()
+        for metric in snapshot["histograms"]:
+            name, labels = metric["name"], metric["labels"]
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in metric["buckets"].items():
+                lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {metric['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {metric['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Save every metric to a file: JSON if the path ends in ".json", the Prometheus text format otherwise.
+
+        Parameters:
+        path (str): The output file.
+
+        Returns:
+        None
+        """
+        content = self.to_json() if path.lower().endswith(".json") else self.to_prometheus()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# The registry the scripts record into
+METRICS = Metrics()
+
+# The number of sessions in progress, so a script run through a wrapper does not start a second one.
+_sessions = 0
+increment = METRICS.increment
+set_gauge = METRICS.set_gauge
+observe = METRICS.observe
+span = METRICS.span
+
+
+@contextmanager
+def session(metrics_path=None, profile_path=None, trace_memory=False, top=15):
+    """
+    Run a block of code with optional profiling, and save its metrics when it ends (even on error or exit).
+
+    Parameters:
+    metrics_path (str): Where to save the metrics, see `Metrics.write` (optional).
+    profile_path (str): Where to save cProfile statistics, readable with `pstats` or snakeviz (optional).
+                        The slowest functions are also printed to stderr.
+    trace_memory (bool): Trace allocations with tracemalloc and print the largest to stderr (default is False).
+                         The peak is recorded in the "process_traced_memory_peak_bytes" gauge.
+    top (int): The number of functions and allocation sites printed (default is 15).
+    """
+    global _sessions
+    _sessions += 1
+    profiler = None
+    if trace_memory:
+        import tracemalloc
+
+        tracemalloc.start()
+    if profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield METRICS
+    finally:
+        _sessions -= 1
+        METRICS.observe("process_run_seconds", time.perf_counter() - start)
+        if profiler is not None:
+            import pstats
+
+            profiler.disable()
+            profiler.dump_stats(profile_path)
+            sys.stderr.write(f"\nProfile saved to {profile_path}; slowest functions (cumulative):\n")
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(top)
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            METRICS.set_gauge("process_traced_memory_peak_bytes", peak)
+            sys.stderr.write(f"\nPeak traced memory: {peak / 1024 / 1024:.1f} MB; largest allocations:\n")
+            for stat in tracemalloc.take_snapshot().statistics("lineno")[:top]:
+                sys.stderr.write(f"  {stat}\n")
+            tracemalloc.stop()
+        if metrics_path:
+            METRICS.write(metrics_path)
+            sys.stderr.write(f"Metrics saved to {metrics_path}\n")
+
+
+def session_options(arguments):
+    """
+    Split the instrumentation options off the front of a command line, falling back to the environment.
+
+    Parameters:
+    arguments (list): The command line, e.g. ["--profile", "run.prof", "move", "--watch"].
+
+    Returns:
+    tuple: The `session` keyword arguments, and the remaining arguments.
+    """
+    options = {
+        "metrics_path": os.getenv("BORING_TASKS_METRICS") or None,
+        "profile_path": os.getenv("BORING_TASKS_PROFILE") or None,
+        "trace_memory": os.getenv("BORING_TASKS_TRACEMALLOC", "").lower() in ("1", "true", "yes"),
+    }
+    arguments = list(arguments)
+    while arguments:
+        if arguments[0] == "--trace-memory":
+            options["trace_memory"] = True
+            arguments.pop(0)
+        elif arguments[0] in ("--metrics", "--profile") and len(arguments) > 1:
+            options[arguments[0][2:] + "_path"] = arguments[1]
+            del arguments[:2]
+        elif arguments[0].startswith(("--metrics=", "--profile=")):
+            option, value = arguments.pop(0).split("=", 1)
+            options[option[2:] + "_path"] = value
+        else:
+            break
+    return options, arguments
+
+
+def enabled(options):
+    return bool(options["metrics_path"] or options["profile_path"] or options["trace_memory"])
+
+
+def main_session():
+    """
+    Give a script started directly the options of the entry points: the instrumentation options in front
+    of its arguments (or the BORING_TASKS_* variables) are taken off `sys.argv`, and the rest of the run
+    is a `session` that ends when the process exits. Call it first thing in the script's `__main__` block;
+    it does nothing inside the session of `boring-tasks.py` or `instrumentation.py`.
+
+    Returns:
+    None
+    """
+    if _sessions:
+        return
+    options, sys.argv[1:] = session_options(sys.argv[1:])
+    if enabled(options):
+        run = session(**options)
+        run.__enter__()
+        # Also runs on sys.exit() and uncaught exceptions.
+        atexit.register(run.__exit__, None, None, None)
+
+
+if __name__ == "__main__":
+    options, arguments = session_options(sys.argv[1:])
+    if not arguments or arguments[0] in ("-h", "--help"):
+        print("usage: python instrumentation.py [--metrics FILE] [--profile FILE] [--trace-memory] "
+              "<script.py> [arguments]")
+        sys.exit(0 if arguments else 2)
+
+    import runpy
+
+    script = os.path.abspath(arguments[0])
+    # Scripts import their sibling modules, as when run from their own folder, and the shared modules
+    # (instrumentation, watcher) of the repository root.
+    sys.path[:0] = [os.path.dirname(script), os.path.dirname(os.path.abspath(__file__))]
+    sys.argv = [script, *arguments[1:]]
+    # Scripts record into this module's registry, not into a second copy run as __main__.
+    sys.modules.setdefault("instrumentation", sys.modules[__name__])
+    with session(**options):
+        runpy.run_path(script, run_name="__main__")
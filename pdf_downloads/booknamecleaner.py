@@ -13,9 +13,7 @@
 from bookname import DOWNLOADED_BOOKS, NOT_DOWNLOADED_BOOKS, NEW_BOOKS
 from books import FIFTY_BOOKS
 import os
-import importlib
 import bookname
-importlib.reload(bookname)
 
 
 def clean_and_update_booklists():
@@ -17,15 +17,17 @@
 
 from bookname import NEW_BOOKS
 import os
+import sys
 import time
 import random
 import ssl
 import requests
 from googlesearch import search
 import booknamecleaner
-import importlib
-import bookname
-importlib.reload(bookname)
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
 
 
 class PDFDownloader:
@@ -58,19 +60,24 @@ class PDFDownloader:
             return "Skipped"
 
         try:
-            response = requests.get(url, stream=True, timeout=15)
-            if response.headers.get("content-type", "").lower() == "application/pdf":
-                with open(file_path, "wb") as pdf_file:
-                    for chunk in response.iter_content(chunk_size=1024):
-                        if chunk:
-                            pdf_file.write(chunk)
-                print(f"Downloaded: {file_path}")
-                return "Downloaded"
-            else:
-                print(f"Skipping (not a PDF): {url}")
-                return "Try_again"
+            with instrumentation.span("download_seconds"):
+                response = requests.get(url, stream=True, timeout=15)
+                if response.headers.get("content-type", "").lower() == "application/pdf":
+                    with open(file_path, "wb") as pdf_file:
+                        for chunk in response.iter_content(chunk_size=1024):
+                            if chunk:
+                                pdf_file.write(chunk)
+                                instrumentation.increment("download_bytes_total", len(chunk))
+                    print(f"Downloaded: {file_path}")
+                    instrumentation.increment("downloads_total", result="downloaded")
+                    return "Downloaded"
+                else:
+                    print(f"Skipping (not a PDF): {url}")
+                    instrumentation.increment("downloads_total", result="not_pdf")
+                    return "Try_again"
         except Exception as e:
             print(f"Error downloading {url}: {e}")
+            instrumentation.increment("downloads_total", result="error")
             return "Error"
 
     def search_and_download(self):
@@ -147,6 +154,7 @@ if __name__ == "__main__":
     This section initializes the PDFDownloader class with a list of books to download.
     It then searches for and downloads the books, and finally prints a summary of the results.
     """
+    instrumentation.main_session()
     downloader = PDFDownloader(NEW_BOOKS)
     downloader.search_and_download()
     downloader.print_summary()
@@ -1,31 +1,220 @@
 import os
+import re
+import time
+import uuid
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import instrumentation
 
 
 class FileRenamer:
-    def __init__(self, directory, extension="pdf"):
+    def __init__(self, directory, extension="pdf", workers=8, batch_size=256):
         """
         Initialize the FileRenamer class with the target directory and file extension.
+        Use extension "all" to rename files of any type.
         """
         self.directory = directory
         self.extension = extension
+        self.workers = workers
+        self.batch_size = batch_size
+        self.renamed_files = []
+        self.skipped_files = []
+        self.unsuccessful_files = []
+        self.elapsed = 0.0
 
     def rename_files(self, target_word, replacement_word):
         """
         Renames files by replacing a target word with a replacement word in all files with the specified extension.
         """
-        for dirpath, _, filenames in os.walk(self.directory):
-            for filename in filenames:
-                if filename.endswith(f'.{self.extension}') and target_word in filename:
-                    new_filename = filename.replace(
-                        target_word, replacement_word)
-                    old_file_path = os.path.join(dirpath, filename)
-                    new_file_path = os.path.join(dirpath, new_filename)
+        plan = self.build_plan(target_word=target_word,
+                               replacement_word=replacement_word)
+        self.execute_plan(plan)
+
+    def build_plan(self, target_word=None, replacement_word="", regex=False, prefix=None, suffix=None,
+                   change_extension=None, paths=None):
+        """
+        Builds the full rename plan in a single pass over the directory tree, before anything is renamed.
+
+        The target word (a compiled regular expression when `regex` is True) is replaced in the whole
+        file name, then the prefix and suffix are added around the name without its extension, and
+        finally the extension is changed. Files whose new name is taken by another file, or claimed by
+        an earlier file of the plan, are skipped. When `paths` is given, only those files are considered
+        instead of scanning the directory.
+
+        Returns a list of (old_path, new_path) tuples.
+        """
+        if target_word and regex:
+            pattern = re.compile(target_word)
+        elif target_word:
+            pattern = re.compile(re.escape(target_word))
+        else:
+            pattern = None
+
+        if change_extension:
+            change_extension = change_extension.lstrip(".")
+
+        if paths is None:
+            paths = (entry.path for entry in self._scan(self.directory))
+
+        candidates = []
+        # Sorted, so which file gets a contested name does not depend on the filesystem order.
+        for path in sorted(paths):
+            filename = os.path.basename(path)
+            if self.extension != "all" and not filename.endswith(f'.{self.extension}'):
+                continue
+            if pattern is not None and not pattern.search(filename):
+                continue
+
+            if pattern is not None:
+                filename = pattern.sub(replacement_word or "", filename)
+            stem, current_extension = os.path.splitext(filename)
+            if change_extension:
+                current_extension = f".{change_extension}"
+            new_filename = f"{prefix or ''}{stem}{suffix or ''}{current_extension}"
+
+            if new_filename != os.path.basename(path):
+                candidates.append(
+                    (path, os.path.join(os.path.dirname(path), new_filename)))
+
+        # A name held by an existing file is only free if that file is itself renamed by the plan.
+        # Skipping a file keeps its name taken, which can in turn skip others: repeat until stable.
+        plan = candidates
+        while True:
+            sources = {old for old, _ in plan}
+            claimed = set()
+            kept = []
+            for old_file_path, new_file_path in plan:
+                if new_file_path in claimed:
+                    self.skipped_files.append(old_file_path)
+                    print(
+                        f'Skipping (name already claimed): {old_file_path} -> {new_file_path}')
+                    continue
+                if os.path.exists(new_file_path) and new_file_path not in sources:
+                    self.skipped_files.append(old_file_path)
+                    print(
+                        f'Skipping (name already exists): {old_file_path} -> {new_file_path}')
+                    continue
+                claimed.add(new_file_path)
+                kept.append((old_file_path, new_file_path))
+            if len(kept) == len(plan):
+                return plan
+            plan = kept
+
+    def execute_plan(self, plan, dry_run=False):
+        """
+        Executes a rename plan in parallel batches.
+
+        Files whose new name is currently held by another file of the plan (chains such as a->b, b->c
+        and cycles such as a->b, b->a) are first moved to a temporary name, so that every final rename
+        targets a free name. With `dry_run`, the plan is only printed.
+        """
+        if dry_run:
+            for old_file_path, new_file_path in plan:
+                print(f'Would rename: {old_file_path} -> {new_file_path}')
+            return
+
+        sources = {old for old, _ in plan}
+        staged = {}
+        for _, new_file_path in plan:
+            if new_file_path in sources:
+                staged[new_file_path] = os.path.join(
+                    os.path.dirname(new_file_path), f'.rename-{uuid.uuid4().hex}')
+
+        start = time.perf_counter()
+        # Stage first: after this step, every target of the plan is free.
+        staged_ok = self._run_batches(
+            [(old, temp, None) for old, temp in staged.items()])
+        operations = []
+        for old_file_path, new_file_path in plan:
+            if (old_file_path in staged and old_file_path not in staged_ok) or \
+                    (new_file_path in staged and new_file_path not in staged_ok):
+                # Renaming now would overwrite a file that could not be moved aside.
+                if old_file_path in staged_ok or old_file_path not in staged:
+                    self.unsuccessful_files.append(old_file_path)
+                continue
+            operations.append(
+                (staged.get(old_file_path, old_file_path), new_file_path, old_file_path))
+        self._run_batches(operations)
+        self.elapsed += time.perf_counter() - start
+
+    def watch(self, debounce=2.0, poll_interval=30.0, **operations):
+        """
+        Renames the files already in the directory, then keeps watching it and renames new files as soon as
+        they are completely written. `operations` are the keyword arguments of `build_plan`.
+        """
+        # Only loaded in watch mode, to keep one-off runs fast to start.
+        from watcher import Watcher
+
+        self.execute_plan(self.build_plan(**operations))
+        produced = set()
+
+        def rename_ready_files(paths):
+            paths = [path for path in paths if path not in produced]
+            plan = self.build_plan(paths=paths, **operations)
+            # Our own renames show up as new files; never rename them twice.
+            produced.update(new for _, new in plan)
+            self.execute_plan(plan)
+
+        watcher = Watcher(self.directory, rename_ready_files, debounce=debounce, poll_interval=poll_interval,
+                          ignore=lambda path: os.path.basename(path).startswith('.rename-'))
+        print(f"Watching {os.path.abspath(self.directory)} (press Ctrl+C to stop)...")
+        watcher.run()
+
+    def _run_batches(self, operations):
+        batches = [operations[i:i + self.batch_size]
+                   for i in range(0, len(operations), self.batch_size)]
+        done = set()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for result in executor.map(self._rename_batch, batches):
+                done.update(result)
+        return done
+
+    def _rename_batch(self, operations):
+        done = []
+        renamed = failed = 0
+        with instrumentation.span("renamer_batch_seconds"):
+            for old_file_path, new_file_path, original_path in operations:
+                try:
+                    # os.rename silently replaces an existing file; never lose one.
+                    if os.path.exists(new_file_path):
+                        raise FileExistsError(f'Destination already exists: {new_file_path}')
                     os.rename(old_file_path, new_file_path)
-                    print(f'Renamed: {old_file_path} -> {new_file_path}')
+                    done.append(old_file_path)
+                    if original_path is not None:
+                        self.renamed_files.append(original_path)
+                        renamed += 1
+                        print(f'Renamed: {original_path} -> {new_file_path}')
+                except Exception as e:
+                    self.unsuccessful_files.append(original_path or old_file_path)
+                    failed += 1
+                    print(f'Error renaming {original_path or old_file_path}: {e}')
+        instrumentation.increment("renamer_files_total", renamed, result="renamed")
+        instrumentation.increment("renamer_files_total", failed, result="failed")
+        return done
+
+    def _scan(self, directory):
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield from self._scan(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+    def summary(self):
+        """
+        Prints a summary of the rename operation, including throughput.
+        """
+        rate = len(self.renamed_files) / self.elapsed if self.elapsed else 0.0
+        print("\nSummary:")
+        print(f"Total files renamed: {len(self.renamed_files)}")
+        print(f"Total files skipped: {len(self.skipped_files)}")
+        print(f"Total files not renamed: {len(self.unsuccessful_files)}")
+        print(f"Elapsed: {self.elapsed:.3f}s ({rate:.0f} files/s)")
 
 
 if __name__ == "__main__":
+    instrumentation.main_session()
     parser = argparse.ArgumentParser(
         description="Automate file renaming in a directory.")
     parser.add_argument("--directory", required=True,
@@ -33,18 +222,43 @@ if __name__ == "__main__":
     parser.add_argument(
         "--replace", help="Target word to replace in filenames.")
     parser.add_argument("--new", help="Replacement word for the target word.")
+    parser.add_argument("--regex", action="store_true",
+                        help="Treat the target word as a regular expression.")
     parser.add_argument("--prefix", help="Prefix to add to filenames.")
     parser.add_argument("--suffix", help="Suffix to add to filenames.")
     parser.add_argument("--extension", default="pdf",
-                        help="File extension to filter by (default is 'pdf').")
+                        help="File extension to filter by (default is 'pdf'). Use 'all' for every file.")
     parser.add_argument(
         "--change_extension", help="New file extension to replace the current extension.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the renames without performing them.")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and rename new files as they arrive in the directory.")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                        help="Seconds a file must stay untouched before it is renamed in watch mode (default is 2).")
+    parser.add_argument("--poll-interval", type=float, default=30.0,
+                        help="Seconds between scans when inotify is unavailable in watch mode (default is 30).")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Number of parallel rename workers (default is 8).")
 
     args = parser.parse_args()
+    if args.replace and args.new is None:
+        parser.error("--replace requires --new (use --new '' to remove the word)")
 
     # Initialize the FileRenamer object
-    renamer = FileRenamer(args.directory, args.extension)
+    renamer = FileRenamer(args.directory, args.extension, workers=args.workers)
+
+    rename_operations = dict(
+        target_word=args.replace, replacement_word=args.new, regex=args.regex,
+        prefix=args.prefix, suffix=args.suffix, change_extension=args.change_extension)
 
-    # Execute the renaming operations based on provided arguments
-    if args.replace and args.new:
-        renamer.rename_files(args.replace, args.new)
+    if args.watch:
+        renamer.watch(debounce=args.debounce,
+                      poll_interval=args.poll_interval, **rename_operations)
+        renamer.summary()
+    else:
+        # Build the whole plan first, then execute the renaming operations
+        rename_plan = renamer.build_plan(**rename_operations)
+        renamer.execute_plan(rename_plan, dry_run=args.dry_run)
+        if not args.dry_run:
+            renamer.summary()
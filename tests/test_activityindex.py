@@ -0,0 +1,58 @@
+import sys
+
+import pytest
+
+pytest.importorskip("docx")
+
+from conftest import ROOT  # noqa: E402
+
+sys.path.insert(0, f"{ROOT}/document-processing")
+from activityindex import ActivityIndex  # noqa: E402
+
+
+def write_report(path, *paragraphs):
+    from docx import Document
+
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(str(path))
+
+
+@pytest.fixture
+def index(tmp_path):
+    reports = tmp_path / "reports"
+    reports.mkdir()
+    write_report(reports / "2024-03-01.docx", "Learning: node.js streams", "Learning: C++ templates",
+                 "Writing: don't repeat yourself", "Reading: react-hooks in depth")
+    activity_index = ActivityIndex(str(tmp_path / "activities.db"))
+    activity_index.update(str(reports), workers=1)
+    return activity_index
+
+
+@pytest.mark.parametrize("term, expected", [
+    ("node.js", "node.js streams"),
+    ("C++", "C++ templates"),
+    ("react-hooks", "react-hooks in depth"),
+    ("don't", "don't repeat yourself"),
+])
+def test_text_with_punctuation_is_searched_literally(index, term, expected):
+    assert [row[3] for row in index.query(text=term)] == [expected]
+
+
+def test_raw_match_queries(index):
+    if not index.full_text:
+        pytest.skip("SQLite built without FTS5")
+    assert [row[3] for row in index.query(match="streams OR templates")] == ["node.js streams", "C++ templates"]
+
+
+def test_changing_the_categories_re_extracts_unchanged_documents(index, tmp_path):
+    categories = tmp_path / "categories.json"
+    categories.write_text('{"Study": ["Learning", "Reading"]}')
+
+    stats = index.update(str(tmp_path / "reports"), str(categories), workers=1)
+
+    assert stats["indexed"] == 1
+    assert [row[3] for row in index.query(category="Study")] == [
+        "node.js streams", "C++ templates", "react-hooks in depth"]
+    assert index.update(str(tmp_path / "reports"), str(categories), workers=1)["unchanged"] == 1
@@ -0,0 +1,206 @@
+import email
+import socketserver
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+
+class FakeSMTPServer(socketserver.ThreadingTCPServer):
+    """A local SMTP server: records what it receives and drops the connection on chosen messages."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.attempts = 0
+        self.quits = 0
+        self.drop_on = set()
+        self.refused = set()
+        self.sent = []
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply(b"220 fake ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command in (b"EHLO", b"HELO"):
+                self.reply(b"250 fake")
+            elif command == b"MAIL":
+                recipients = []
+                self.reply(b"250 OK")
+            elif command == b"RCPT":
+                address = line.split(b"<", 1)[1].split(b">", 1)[0].decode()
+                if address in server.refused:
+                    self.reply(b"550 No such user")
+                else:
+                    recipients.append(address)
+                    self.reply(b"250 OK")
+            elif command == b"DATA":
+                self.reply(b"354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+                with server.lock:
+                    server.attempts += 1
+                    if server.attempts in server.drop_on:
+                        return
+                    server.sent.append((recipients[0], b"".join(lines)))
+                self.reply(b"250 OK")
+            elif command == b"QUIT":
+                with server.lock:
+                    server.quits += 1
+                self.reply(b"221 Bye")
+                return
+            else:
+                self.reply(b"250 OK")
+
+
+@pytest.fixture
+def smtp_server():
+    server = FakeSMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def scheduler(load_script, monkeypatch, smtp_server):
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(smtp_server.server_address[1]))
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+    monkeypatch.setenv("SENDER_EMAIL", "me@example.org")
+    monkeypatch.delenv("EMAIL_PASSWORD", raising=False)
+    email_automation = load_script("communication-automation/email-automation.py")
+    return email_automation.EmailScheduler()
+
+
+def test_send_bulk_recycles_and_reconnects(scheduler, smtp_server):
+    smtp_server.drop_on = {4}
+    messages = [(f"user{i}@example.org", "Subject", "Body") for i in range(10)]
+
+    stats = scheduler.send_bulk(messages, connections=1, max_messages_per_connection=3, retries=1)
+
+    assert stats["sent"] == 10 and stats["failed"] == 0
+    assert sorted(recipient for recipient, _ in smtp_server.sent) == sorted(m[0] for m in messages)
+    # 10 messages at 3 per connection, plus one reconnect after the dropped send.
+    assert smtp_server.connections == 5
+
+
+def test_send_bulk_gives_up_after_retries(scheduler, smtp_server):
+    smtp_server.drop_on = {1, 2}
+
+    stats = scheduler.send_bulk([("a@example.org", "Subject", "Body")], connections=1, retries=1)
+
+    assert stats == {**stats, "sent": 0, "failed": 1}
+
+
+def test_send_bulk_does_not_hang_when_messages_raise(scheduler):
+    def messages():
+        yield "a@example.org", "Subject", "Body"
+        raise OSError("recipients file vanished")
+
+    result = {}
+
+    def run():
+        try:
+            scheduler.send_bulk(messages(), connections=2)
+        except OSError as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert "error" in result
+
+
+def test_serialized_attachment_is_reused_and_valid(scheduler, tmp_path):
+    import os
+
+    attachment = tmp_path / "report.pdf"
+    content = os.urandom(300_000)
+    attachment.write_bytes(content)
+
+    first = scheduler.serialize_message("a@example.org", "Report", "Hello A", str(attachment))
+    second = scheduler.serialize_message("b@example.org", "Report", "Hello B", str(attachment))
+
+    assert len(scheduler._attachment_cache) == 1
+    for raw, recipient, text in ((first, "a@example.org", "Hello A"), (second, "b@example.org", "Hello B")):
+        parsed = email.message_from_bytes(raw)
+        body, part = parsed.get_payload()
+        assert parsed["To"] == recipient
+        assert body.get_payload() == text
+        assert part.get_filename() == "report.pdf"
+        assert part.get_payload(decode=True) == content
+
+
+def test_deliver_sends_the_attachment(scheduler, smtp_server, tmp_path):
+
+    attachment = tmp_path / "notes.txt"
+    attachment.write_bytes(b"notes")
+    scheduler.deliver("a@example.org", "Notes", "See attached", str(attachment))
+
+    (recipient, raw), = smtp_server.sent
+    assert email.message_from_bytes(raw).get_payload()[1].get_payload(decode=True) == b"notes"
+
+
+def test_send_bulk_dot_stuffs_the_text_and_skips_refused_recipients(scheduler, smtp_server):
+
+    smtp_server.refused = {"gone@example.org"}
+    stats = scheduler.send_bulk([("gone@example.org", "Subject", "Body"),
+                                 ("a@example.org", "Subject", ".hidden\n.\nend")], connections=1)
+
+    assert stats["sent"] == 1 and stats["failed"] == 1
+    (recipient, raw), = smtp_server.sent
+    text = email.message_from_bytes(raw).get_payload()[0].get_payload()
+    assert text.replace("\r\n", "\n") == ".hidden\n.\nend"
+
+
+def test_mail_merge_queues_each_recipient_once_per_campaign(scheduler, tmp_path):
+    from outbox import Outbox
+
+    recipients = tmp_path / "recipients.csv"
+    recipients.write_text("email,name\na@example.org,A\nbad,B\nA@example.org,C\nb@example.org,D\n")
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+
+    first = scheduler.mail_merge(str(recipients), "Hi {name}", "Hello {name}", outbox=outbox, campaign="w1")
+    again = scheduler.mail_merge(str(recipients), "Hi {name}", "Hello {name}", outbox=outbox, campaign="w1")
+
+    assert (first, again) == ({"queued": 2}, {"queued": 0})
+    assert outbox.stats() == {"pending": 2}
+
+
+def test_outbox_run_closes_the_delivery_connections(scheduler, smtp_server, tmp_path):
+    from outbox import Outbox
+
+    outbox = Outbox(str(tmp_path / "outbox.db"))
+    scheduler.register_outbox(outbox)
+    for i in range(6):
+        scheduler.enqueue_email(outbox, f"r{i}@example.org", "Subject", "Body")
+
+    assert outbox.run(workers=3) == {"sent": 6}
+    assert smtp_server.connections >= 1
+    assert smtp_server.quits == smtp_server.connections
+
+    # A later run reconnects instead of reusing a closed connection.
+    scheduler.enqueue_email(outbox, "late@example.org", "Subject", "Body")
+    assert outbox.run(workers=1) == {"sent": 7}
@@ -0,0 +1,58 @@
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, f"{ROOT}/file-transfert")
+from hashindex import HashIndex, PARTIAL_BLOCK_SIZE  # noqa: E402
+
+
+def test_files_of_another_size_are_not_read(tmp_path):
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "a.pdf").write_bytes(b"a" * 10)
+    (tmp_path / "b.pdf").write_bytes(b"a" * 11)
+    index = HashIndex(str(tmp_path / "dst")).load()
+
+    assert index.find_duplicate(str(tmp_path / "b.pdf")) is None
+    assert (index.partial_hashes, index.full_hashes) == (0, 0)
+
+
+def test_different_heads_stop_at_the_partial_hash(tmp_path):
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "a.pdf").write_bytes(b"a" * 10)
+    (tmp_path / "b.pdf").write_bytes(b"b" * 10)
+    index = HashIndex(str(tmp_path / "dst")).load()
+
+    assert index.find_duplicate(str(tmp_path / "b.pdf")) is None
+    assert (index.partial_hashes, index.full_hashes) == (2, 0)
+
+
+def test_only_a_full_hash_tells_files_differing_in_the_middle(tmp_path):
+    size = 3 * PARTIAL_BLOCK_SIZE
+    original = b"a" * size
+    changed = original[:size // 2] + b"b" + original[size // 2 + 1:]
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "a.pdf").write_bytes(original)
+    (tmp_path / "b.pdf").write_bytes(changed)
+    (tmp_path / "c.pdf").write_bytes(original)
+    index = HashIndex(str(tmp_path / "dst")).load()
+
+    assert index.find_duplicate(str(tmp_path / "b.pdf")) is None
+    assert index.find_duplicate(str(tmp_path / "c.pdf")) == str(tmp_path / "dst" / "a.pdf")
+    assert index.full_hashes == 3
+
+
+def test_saved_hashes_are_reused_until_the_file_changes(tmp_path):
+    (tmp_path / "dst").mkdir()
+    (tmp_path / "dst" / "a.pdf").write_bytes(b"a" * 10)
+    (tmp_path / "b.pdf").write_bytes(b"a" * 10)
+    index = HashIndex(str(tmp_path / "dst")).load()
+    index.find_duplicate(str(tmp_path / "b.pdf"))
+    index.save()
+
+    reloaded = HashIndex(str(tmp_path / "dst")).load()
+    assert "full" in reloaded.entries[str(tmp_path / "dst" / "a.pdf")]
+
+    (tmp_path / "dst" / "a.pdf").write_bytes(b"c" * 12)
+    invalidated = HashIndex(str(tmp_path / "dst")).load()
+    assert "full" not in invalidated.entries[str(tmp_path / "dst" / "a.pdf")]
+    assert invalidated.find_duplicate(str(tmp_path / "b.pdf")) is None
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def run(arguments, tmp_path, **environment):
+    env = {key: value for key, value in os.environ.items() if not key.startswith(("BORING_TASKS_", "PYTHONPATH"))}
+    return subprocess.run([sys.executable, *arguments], cwd=tmp_path, env={**env, **environment},
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_a_script_started_directly_saves_its_metrics(tmp_path):
+    for folder in ("src", "dst"):
+        (tmp_path / folder).mkdir()
+    (tmp_path / "src" / "a.pdf").write_text("a")
+
+    result = run([f"{ROOT}/file-transfert/move.py", "--metrics", "metrics.json", "src", "dst", "--type", "pdf"],
+                 tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "dst" / "a.pdf").exists()
+    assert "mover_files_total" in json.dumps(json.loads((tmp_path / "metrics.json").read_text()))
+
+
+def test_an_entry_point_session_is_not_started_twice(tmp_path):
+    for folder in ("src", "dst"):
+        (tmp_path / folder).mkdir()
+    (tmp_path / "src" / "a.pdf").write_text("a")
+
+    result = run([f"{ROOT}/boring-tasks.py", "move", "src", "dst", "--type", "pdf"], tmp_path,
+                 BORING_TASKS_METRICS="metrics.prom")
+
+    assert result.returncode == 0, result.stderr
+    assert (tmp_path / "dst" / "a.pdf").exists()
+    assert result.stderr.count("Metrics saved") == 1
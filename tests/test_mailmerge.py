@@ -0,0 +1,35 @@
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, f"{ROOT}/communication-automation")
+from mailmerge import MailMerge, read_rows  # noqa: E402
+
+
+def test_csv_with_byte_order_mark(tmp_path):
+    recipients = tmp_path / "recipients.csv"
+    recipients.write_bytes("email,first_name\r\nana@example.org,Ana\r\n".encode("utf-8-sig"))
+    merge = MailMerge("Hi {first_name}", "Hello {first_name}")
+
+    assert list(merge.merge(read_rows(str(recipients)))) == [("ana@example.org", "Hi Ana", "Hello Ana")]
+    assert merge.invalid == 0
+
+
+def test_jsonl_skips_invalid_and_duplicate_rows(tmp_path):
+    recipients = tmp_path / "recipients.jsonl"
+    recipients.write_text("\n".join([
+        '{"email": "ana@example.org", "week": 1}',
+        '{"email": "not an address", "week": 1}',
+        '{"email": "bob@example.org"}',
+        "{broken",
+        '{"email": "BOB@example.org", "week": 2}',
+        '{"email": "ana@example.org", "week": 3}',
+    ]) + "\n")
+    merge = MailMerge("Week {week}", "Report {week}")
+
+    assert list(merge.merge(read_rows(str(recipients)))) == [
+        ("ana@example.org", "Week 1", "Report 1"),
+        ("BOB@example.org", "Week 2", "Report 2"),
+    ]
+    # bob's first row misses a field: his next row is merged, not counted as a duplicate.
+    assert (merge.merged, merge.invalid, merge.failed, merge.duplicates) == (2, 1, 1, 1)
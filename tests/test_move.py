@@ -0,0 +1,183 @@
+def test_undo_does_not_replace_a_new_source_file(tmp_path, load_script):
+    move = load_script("file-transfert/move.py")
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    (src / "r.pdf").write_text("old")
+
+    move.Mover(str(src), str(dst)).move_files(str(src), str(dst), "pdf")
+    (src / "r.pdf").write_text("new")
+    mover = move.Mover(str(src), str(dst))
+    mover.undo(str(dst))
+
+    assert (src / "r.pdf").read_text() == "new"
+    assert (dst / "r.pdf").read_text() == "old"
+    assert mover.unsuccessful_files == [str(dst / "r.pdf")]
+
+
+def test_watch_moves_existing_files_after_resuming_a_batch(tmp_path, load_script, monkeypatch):
+    import json
+    import watcher
+
+    move = load_script("file-transfert/move.py")
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    (src / "notes.txt").write_text("existing")
+    # An interrupted "all" batch whose only move was already done.
+    (dst / move.JOURNAL_NAME).write_text(json.dumps({
+        "op": "plan", "batch": "1", "src": str(src), "dst": str(dst), "type": "all",
+        "moves": [[str(src / "done.txt"), str(dst / "done.txt")]], "skipped": []}) + "\n")
+    (dst / "done.txt").write_text("done")
+
+    class NoWatcher:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def run(self):
+            pass
+
+    monkeypatch.setattr(watcher, "Watcher", NoWatcher)
+    move.Mover(str(src), str(dst)).watch(str(src), str(dst), "all")
+
+    assert (dst / "notes.txt").read_text() == "existing"
+
+
+def test_dedup_index_is_reused_across_watched_batches(tmp_path, load_script):
+    move = load_script("file-transfert/move.py")
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    mover = move.Mover(str(src), str(dst), dedup="skip")
+    mover.file_src_abs_path, mover.file_dst_abs_path = str(src), str(dst)
+
+    (src / "a.pdf").write_bytes(b"a" * 100)
+    mover._move_ready_files([str(src / "a.pdf")])
+    (src / "b.pdf").write_bytes(b"b" * 100)
+    (src / "c.pdf").write_bytes(b"a" * 100)
+    mover._move_ready_files([str(src / "b.pdf"), str(src / "c.pdf")])
+
+    assert (dst / "b.pdf").read_bytes() == b"b" * 100
+    assert not (dst / "c.pdf").exists()
+    assert mover.skipped_files == [str(src / "c.pdf")]
+
+
+def test_a_failing_batch_does_not_stop_the_watcher(tmp_path, capsys):
+    from watcher import Watcher
+
+    (tmp_path / "a.pdf").write_text("a")
+    batches = []
+
+    def callback(paths):
+        batches.append(paths)
+        raise FileNotFoundError("gone")
+
+    watcher = Watcher(str(tmp_path), callback, debounce=0)
+    watcher.pending[str(tmp_path / "a.pdf")] = 0
+    watcher._flush()
+
+    assert batches == [[str(tmp_path / "a.pdf")]]
+    assert "Error processing 1 file(s): gone" in capsys.readouterr().out
+
+
+def test_watcher_reports_files_missed_when_falling_back_to_polling(tmp_path):
+    import sys
+    import threading
+    import time
+
+    import pytest
+    import watcher
+
+    if not sys.platform.startswith("linux"):
+        pytest.skip("inotify is only available on Linux")
+
+    reported = []
+
+    def callback(paths):
+        reported.extend(paths)
+        directory_watcher.stop()
+
+    directory_watcher = watcher.Watcher(str(tmp_path), callback, debounce=0.05, poll_interval=0.1)
+    add_watch = directory_watcher._add_watch
+
+    def limited_add_watch(directory):
+        if directory != str(tmp_path):
+            raise watcher.WatchLimitError(28, "No space left on device")
+        add_watch(directory)
+
+    directory_watcher._add_watch = limited_add_watch
+    thread = threading.Thread(target=directory_watcher.run, daemon=True)
+    thread.start()
+    while not directory_watcher._watches:
+        time.sleep(0.01)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "new.pdf").write_text("new")
+    thread.join(5)
+
+    assert directory_watcher.mode == "poll"
+    assert reported == [str(tmp_path / "sub" / "new.pdf")]
+
+
+def test_dedup_link_mode_hard_links_duplicates(tmp_path, load_script):
+    import os
+
+    move = load_script("file-transfert/move.py")
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    (dst / "original.pdf").write_text("same")
+    (src / "copy.pdf").write_text("same")
+
+    move.Mover(str(src), str(dst), dedup="link").move_files(str(src), str(dst), "pdf")
+
+    assert not (src / "copy.pdf").exists()
+    assert os.path.samefile(dst / "copy.pdf", dst / "original.pdf")
+
+
+def test_resume_completes_a_link_interrupted_before_removing_the_source(tmp_path, load_script):
+    import json
+    import os
+
+    move = load_script("file-transfert/move.py")
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    (dst / "original.pdf").write_text("same")
+    (src / "copy.pdf").write_text("same")
+    # The crash happened after os.link but before os.remove.
+    os.link(dst / "original.pdf", dst / "copy.pdf")
+    (dst / move.JOURNAL_NAME).write_text(json.dumps({
+        "op": "plan", "batch": "1", "src": str(src), "dst": str(dst), "type": "pdf",
+        "moves": [[str(src / "copy.pdf"), str(dst / "copy.pdf"), str(dst / "original.pdf")]],
+        "skipped": []}) + "\n")
+
+    mover = move.Mover(str(src), str(dst), dedup="link")
+    mover.move_files(str(src), str(dst), "pdf")
+
+    assert not (src / "copy.pdf").exists()
+    assert mover.moved_files == [str(src / "copy.pdf")] and mover.unsuccessful_files == []
+
+
+def test_journal_keeps_only_what_resume_and_undo_need(tmp_path, load_script):
+    import json
+
+    move = load_script("file-transfert/move.py")
+    src, dst = tmp_path / "src", tmp_path / "dst"
+    src.mkdir()
+    dst.mkdir()
+    journal = dst / move.JOURNAL_NAME
+    # An unfinished batch of another source must survive compaction.
+    journal.write_text(json.dumps({
+        "op": "plan", "batch": "0", "src": str(tmp_path / "other"), "dst": str(dst), "type": "pdf",
+        "moves": [], "skipped": []}) + "\n")
+
+    for name in ("a", "b", "c"):
+        (src / f"{name}.pdf").write_text(name)
+        move.Mover(str(src), str(dst)).move_files(str(src), str(dst), "pdf")
+
+    plans = [entry for entry in map(json.loads, journal.read_text().splitlines()) if entry["op"] == "plan"]
+    assert [plan["moves"][0][0] if plan["moves"] else plan["batch"] for plan in plans] == ["0", str(src / "c.pdf")]
+
+    move.Mover(str(src), str(dst)).undo(str(dst))
+    assert (src / "c.pdf").exists() and (dst / "b.pdf").exists()
+    assert [entry["batch"] for entry in map(json.loads, journal.read_text().splitlines())] == ["0"]
@@ -0,0 +1,38 @@
+import sys
+
+from conftest import ROOT
+
+sys.path.insert(0, f"{ROOT}/communication-automation")
+from outbox import Outbox  # noqa: E402
+
+
+def test_messages_of_unregistered_channels_are_left_pending(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), max_attempts=1)
+    sent = []
+    outbox.register("email", sent.append)
+    outbox.enqueue("email", {"to": "a@example.org"})
+    outbox.enqueue("sms", {"to_number": "+1234567890"})
+
+    stats = outbox.run(workers=2)
+
+    assert sent == [{"to": "a@example.org"}]
+    assert stats == {"sent": 1, "pending": 1}
+    assert outbox.dead_letters() == []
+
+
+def test_run_until_empty_waits_for_retries(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.db"), backoff=0.1)
+    attempts = []
+
+    def flaky(payload):
+        attempts.append(payload)
+        if len(attempts) < 3:
+            raise ConnectionError("try again")
+
+    outbox.register("email", flaky)
+    outbox.enqueue("email", {"to": "a@example.org"})
+
+    stats = outbox.run(workers=2, poll_interval=0.05)
+
+    assert len(attempts) == 3
+    assert stats == {"sent": 1}
@@ -0,0 +1,106 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+openai = pytest.importorskip("openai", minversion="0.28")
+pytest.importorskip("dotenv")
+
+from conftest import ROOT  # noqa: E402
+
+sys.path.insert(0, f"{ROOT}/ai-prompting")
+import prompt  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers chat completions with the prompt in upper case, after the scripted failures."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            failure = server.failures.pop(0) if server.failures else None
+        if failure:
+            status, retry_after = failure
+            self.reply(status, {"error": {"message": "try again", "type": "server_error"}},
+                       {"Retry-After": retry_after})
+        else:
+            answer = body["messages"][-1]["content"].upper()
+            self.reply(200, {"id": "stub", "object": "chat.completion", "model": body["model"],
+                             "choices": [{"index": 0, "message": {"role": "assistant", "content": answer},
+                                          "finish_reason": "stop"}]})
+
+    def reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.failures = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openai, "api_base", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    monkeypatch.setattr(openai, "api_key", "test")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def collect(prompts, **options):
+    async def run():
+        return [item async for item in prompt.prompt_chatgpt_stream(prompts, use_cache=False, **options)]
+    return sorted(asyncio.run(run()))
+
+
+def test_rate_limited_requests_wait_for_retry_after(stub):
+    stub.failures = [(429, "0.3")]
+
+    start = time.perf_counter()
+    results = collect(["hello", "world"], concurrency=1)
+
+    assert results == [(0, "HELLO", None), (1, "WORLD", None)]
+    assert stub.requests == 3
+    assert time.perf_counter() - start >= 0.3
+
+
+def test_failing_requests_are_retried_a_bounded_number_of_times(stub):
+    stub.failures = [(503, "0.01")] * 10
+
+    (index, response, error), = collect(["hello"], max_retries=2)
+
+    assert (index, response) == (0, "")
+    assert error
+    assert stub.requests == 3
+
+
+def test_repeated_prompts_of_a_batch_send_one_request(stub, tmp_path, monkeypatch):
+    from responsecache import ResponseCache
+
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(prompt, "_cache", cache)
+
+    async def run():
+        return [item async for item in prompt.prompt_chatgpt_stream(["same"] * 5 + ["other"])]
+    results = sorted(asyncio.run(run()))
+
+    assert results == [(i, "SAME", None) for i in range(5)] + [(5, "OTHER", None)]
+    assert stub.requests == 2
+    # The repeats shared the in-flight request instead of reading the cache afterwards.
+    assert (cache.stats()["misses"], cache.stats()["hits"]) == (2, 0)
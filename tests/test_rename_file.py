@@ -0,0 +1,33 @@
+def write(path, content):
+    path.write_text(content)
+    return path
+
+
+def test_rename_onto_a_skipped_file_keeps_its_content(tmp_path, load_script):
+    rename_file = load_script("rename-file.py")
+    write(tmp_path / "a.pdf", "A")
+    write(tmp_path / "a1.pdf", "A1")
+    write(tmp_path / "a11.pdf", "A11")
+
+    renamer = rename_file.FileRenamer(str(tmp_path))
+    plan = renamer.build_plan(target_word=r"1\.", replacement_word=".", regex=True)
+    renamer.execute_plan(plan)
+
+    # a1.pdf -> a.pdf is skipped, so a1.pdf keeps its name and a11.pdf must not take it.
+    assert plan == []
+    assert (tmp_path / "a.pdf").read_text() == "A"
+    assert (tmp_path / "a1.pdf").read_text() == "A1"
+    assert (tmp_path / "a11.pdf").read_text() == "A11"
+
+
+def test_swap_through_the_plan_still_works(tmp_path, load_script):
+    rename_file = load_script("rename-file.py")
+    write(tmp_path / "x.pdf", "X")
+    write(tmp_path / "xx.pdf", "XX")
+
+    renamer = rename_file.FileRenamer(str(tmp_path))
+    renamer.execute_plan(renamer.build_plan(prefix="x"))
+
+    assert (tmp_path / "xx.pdf").read_text() == "X"
+    assert (tmp_path / "xxx.pdf").read_text() == "XX"
+    assert not (tmp_path / "x.pdf").exists()
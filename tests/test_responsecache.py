@@ -0,0 +1,62 @@
+import sys
+import threading
+import time
+
+from conftest import ROOT
+
+sys.path.insert(0, f"{ROOT}/ai-prompting")
+from responsecache import ResponseCache  # noqa: E402
+
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=25)
+    for key in ("a", "b"):
+        cache.put(key, "x" * 10)
+        time.sleep(0.01)
+    cache.get("a")
+    time.sleep(0.01)
+
+    cache.put("c", "x" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == cache.get("c") == "x" * 10
+    assert cache.stats()["evicted"] == 1
+
+
+def test_expired_responses_are_requested_again(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=0.05)
+    cache.put("a", "answer")
+    assert cache.get("a") == "answer"
+
+    time.sleep(0.1)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expired"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_identical_requests_from_several_threads_are_computed_once(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    release = threading.Event()
+    calls = []
+
+    def compute(prompt):
+        calls.append(prompt)
+        release.wait(5)
+        return prompt.upper()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute, "hello")))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()["coalesced"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == ["hello"]
+    assert results == ["HELLO"] * 5
+    assert cache.get_or_compute("k", compute, "hello") == "HELLO"
+    assert calls == ["hello"]
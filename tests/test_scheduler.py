@@ -0,0 +1,30 @@
+import json
+import sys
+import threading
+import time
+from datetime import datetime
+
+from conftest import ROOT
+
+sys.path.insert(0, f"{ROOT}/communication-automation")
+from scheduler import Scheduler  # noqa: E402
+
+
+def test_a_slow_job_does_not_delay_the_others(tmp_path):
+    state_path = tmp_path / "state.json"
+    scheduler = Scheduler(str(state_path), workers=2)
+    release = threading.Event()
+    fast_done = threading.Event()
+    scheduler.add_job("slow", "* * * * *", release.wait)
+    scheduler.add_job("fast", "* * * * *", fast_done.set)
+
+    start = time.perf_counter()
+    assert scheduler.run_pending(datetime(2100, 1, 1)) == 2
+    assert time.perf_counter() - start < 1
+    assert fast_done.wait(1)
+
+    # The slow job is still running: it is not started a second time.
+    assert scheduler.run_pending(datetime(2100, 1, 2)) == 1
+    release.set()
+    scheduler.wait()
+    assert json.loads(state_path.read_text())["slow"] == "2100-01-01T00:00:00"
@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+
+class FakeTransport:
+    """Stands in for Twilio: records when each message is sent and how many are in flight."""
+
+    def __init__(self, latency=0.2, failing=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.lock = threading.Lock()
+        self.sent = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, to_number, message):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if to_number in self.failing:
+                raise ConnectionError("provider unavailable")
+            with self.lock:
+                self.sent.append((time.monotonic(), to_number))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+def test_bulk_sms_respects_the_rate_and_runs_concurrently(load_script):
+    sms = load_script("communication-automation/sms-automation.py")
+    transport = FakeTransport(failing={"+10000000003"})
+    numbers = [f"+1000000000{i}" for i in range(8)]
+    rate = 20.0
+
+    stats = sms.send_bulk_text_messages(((number, "Reminder") for number in numbers), workers=4,
+                                        rate=rate, transport=transport)
+
+    assert (stats["sent"], stats["failed"]) == (7, 1)
+    assert sorted(number for _, number in transport.sent) == sorted(set(numbers) - {"+10000000003"})
+    # No burst: n messages need at least (n - 1) / rate seconds.
+    assert stats["elapsed"] >= (len(numbers) - 1) / rate
+    # Sends overlap (each takes longer than the rate interval), but never beyond the worker count.
+    assert 1 < transport.max_in_flight <= 4
+
+
+def test_messages_without_a_number_are_not_sent(load_script):
+    sms = load_script("communication-automation/sms-automation.py")
+    transport = FakeTransport(latency=0)
+
+    stats = sms.send_bulk_text_messages([("", "Reminder"), ("+10000000001", "")], rate=100, transport=transport)
+
+    assert (stats["sent"], stats["failed"]) == (0, 2)
+    assert transport.sent == []
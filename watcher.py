@@ -0,0 +1,233 @@
+########################################################################################################################
+# Directory Watcher                                                                                                    #
+#                                                                                                                      #
+# This module watches a directory tree and reports files once they are complete, so that long-running tools can apply #
+# their rules incrementally instead of re-walking the whole tree on every run.                                         #
+#                                                                                                                      #
+# On Linux it uses inotify (through ctypes, no extra dependency) and reacts to create, close-write and moved-to        #
+# events. Files are debounced: a file is reported only after it has seen no event for `debounce` seconds. When         #
+# inotify is unavailable or the watch limits are exceeded, it falls back to a periodic scandir scan.                  #
+########################################################################################################################
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class WatchLimitError(OSError):
+    """Raised when inotify cannot be used, e.g. when the watch limits are exceeded."""
+
+
+class Watcher:
+    def __init__(self, directory, callback, debounce=2.0, poll_interval=30.0, ignore=None):
+        """
+        Initialize the watcher.
+
+        Parameters:
+        directory (str): The directory tree to watch.
+        callback (callable): Called with a list of file paths that are ready to be processed.
+        debounce (float): Seconds without any event before a file is considered complete.
+        poll_interval (float): Seconds between scans when falling back to polling.
+        ignore (callable): Optional predicate; paths for which it returns True are never reported.
+        """
+        self.directory = os.path.abspath(directory)
+        self.callback = callback
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.ignore = ignore or (lambda path: False)
+        self.pending = {}
+        self.mode = None
+        self._running = False
+        self._fd = None
+        self._watches = {}
+
+    def run(self):
+        """
+        Watch the directory until `stop()` is called or the process is interrupted.
+
+        Returns:
+        None
+        """
+        self._running = True
+        try:
+            try:
+                self._start_inotify()
+            except WatchLimitError as e:
+                print(f"inotify unavailable ({e}), falling back to polling every {self.poll_interval}s.")
+                self._close()
+                self._poll_loop()
+                return
+            self._inotify_loop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._close()
+
+    def stop(self):
+        """
+        Ask the watcher to stop after its current iteration.
+
+        Returns:
+        None
+        """
+        self._running = False
+
+    def _start_inotify(self):
+        if not sys.platform.startswith("linux"):
+            raise WatchLimitError(errno.ENOSYS, "inotify is only available on Linux")
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise WatchLimitError(code, os.strerror(code))
+
+        self.mode = "inotify"
+        self._add_tree(self.directory)
+
+    def _add_tree(self, directory):
+        self._add_watch(directory)
+        for root, dirs, _ in os.walk(directory):
+            for name in dirs:
+                self._add_watch(os.path.join(root, name))
+
+    def _add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            if code in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise WatchLimitError(code, os.strerror(code))
+        self._watches[wd] = directory
+
+    def _inotify_loop(self):
+        while self._running:
+            readable, _, _ = select.select([self._fd], [], [], self._timeout())
+            if readable:
+                try:
+                    self._read_events()
+                except WatchLimitError as e:
+                    print(f"Watch limit reached ({e}), falling back to polling every {self.poll_interval}s.")
+                    self._close()
+                    self._poll_loop(rescan=True)
+                    return
+            self._flush()
+
+    def _read_events(self):
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        now = time.monotonic()
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped; recover with a full scan.
+                self._scan_into_pending(self.directory, now)
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._add_tree(path)
+                    # Files may have landed before the watch was added.
+                    self._scan_into_pending(path, now)
+            elif not self.ignore(path):
+                self.pending[path] = now
+
+    def _poll_loop(self, rescan=False):
+        self.mode = "poll"
+        # Files already present when polling starts are the baseline, not new arrivals...
+        snapshot = dict(self._scan(self.directory))
+        if rescan:
+            # ...unless inotify gave up mid-run: files in unwatched folders and unread events would be lost,
+            # so every file is reported again once it is stable.
+            now = time.monotonic()
+            for path in snapshot:
+                self.pending[path] = now
+        next_scan = time.monotonic() + self.poll_interval
+        while self._running:
+            now = time.monotonic()
+            if now >= next_scan:
+                current = dict(self._scan(self.directory))
+                for path, signature in current.items():
+                    if snapshot.get(path) != signature:
+                        self.pending[path] = now
+                snapshot = current
+                next_scan = now + self.poll_interval
+                # Only flush right after a scan, so a file is reported once its size and
+                # mtime have stayed the same across two scans.
+                self._flush()
+            time.sleep(min(self._timeout(), max(next_scan - time.monotonic(), 0.0)))
+
+    def _scan(self, directory):
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from self._scan(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and not self.ignore(entry.path):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield entry.path, (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            return
+
+    def _scan_into_pending(self, directory, now):
+        for path, _ in self._scan(directory):
+            self.pending[path] = now
+
+    def _timeout(self):
+        return max(min(self.debounce, 1.0), 0.05)
+
+    def _flush(self):
+        now = time.monotonic()
+        ready = [path for path, seen in self.pending.items() if now - seen >= self.debounce]
+        if not ready:
+            return
+
+        for path in ready:
+            del self.pending[path]
+        ready = [path for path in ready if os.path.isfile(path)]
+        if ready:
+            try:
+                self.callback(sorted(ready))
+            except Exception as e:
+                # One failing batch must not stop a long-running watch.
+                print(f"Error processing {len(ready)} file(s): {e}")
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._watches = {}
@@ -1,19 +1,27 @@
 import requests
 from bs4 import BeautifulSoup
 import os
+import sys
 import re
 import time
 
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
+
 
 def download_pdf(pdf_url, download_folder):
     """Downloads a PDF given its URL."""
-    response = requests.get(pdf_url, stream=True)
-    pdf_name = pdf_url.split('/')[-1] + ".pdf"
-    pdf_path = os.path.join(download_folder, pdf_name)
+    with instrumentation.span("download_seconds"):
+        response = requests.get(pdf_url, stream=True)
+        pdf_name = pdf_url.split('/')[-1] + ".pdf"
+        pdf_path = os.path.join(download_folder, pdf_name)
 
-    with open(pdf_path, "wb") as pdf_file:
-        for chunk in response.iter_content(chunk_size=1024):
-            pdf_file.write(chunk)
+        with open(pdf_path, "wb") as pdf_file:
+            for chunk in response.iter_content(chunk_size=1024):
+                pdf_file.write(chunk)
+                instrumentation.increment("download_bytes_total", len(chunk))
+    instrumentation.increment("downloads_total", result="downloaded")
     print(f"Downloaded: {pdf_path}")
 
 
@@ -54,5 +62,6 @@ def find_pdfs(base_url, download_folder="pdf_downloads"):
 
 
 if __name__ == "__main__":
+    instrumentation.main_session()
     base_url = "https://www.pdfdrive.com"
     find_pdfs(base_url)
@@ -17,11 +17,14 @@
 #############################################################################################################
 
 import os
+import sys
 import argparse
 import multiprocessing as mp
 from collections import Counter
-import PyPDF2
-import docx
+
+# instrumentation.py lives at the repository root.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import instrumentation  # noqa: E402
 
 
 class WordCounter:
@@ -81,6 +84,9 @@ class WordCounter:
         extracts the text content from each page, and concatenates them into a single string.
         The resulting text is then encoded in UTF-8 and returned.
         """
+        # Imported here so that counting words in text files does not load PyPDF2.
+        import PyPDF2
+
         text = ""
         with open(file_path, 'rb') as f:
             reader = PyPDF2.PdfReader(f)
@@ -110,6 +116,9 @@ class WordCounter:
             raise FileNotFoundError(
                 f"File not found: {os.path.abspath(file_path)}")
 
+        # Imported here so that counting words in text files does not load python-docx.
+        import docx
+
         try:
             text = ""
             doc = docx.Document(file_path)
@@ -146,31 +155,37 @@ class WordCounter:
         num_workers = mp.cpu_count()
         pool = mp.Pool(num_workers)
 
-        if file_extension == ".pdf":
-            # Read PDF file
-            content = self._read_pdf_file(self.path)
-            chunks = [content[i:i + 1024 * 1024]
-                      for i in range(0, len(content), 1024 * 1024)]
-        elif file_extension == ".docx":
-            # Read Word file
-            content = self._read_word_file(self.path)
-            chunks = [content[i:i + 1024 * 1024]
-                      for i in range(0, len(content), 1024 * 1024)]
-        else:
-            # Read text file
-            chunks = list(self._read_file_in_chunks(self.path))
+        file_format = file_extension.lstrip(".") if file_extension in (".pdf", ".docx") else "text"
+        with instrumentation.span("wordcount_read_seconds", format=file_format):
+            if file_extension == ".pdf":
+                # Read PDF file
+                content = self._read_pdf_file(self.path)
+                chunks = [content[i:i + 1024 * 1024]
+                          for i in range(0, len(content), 1024 * 1024)]
+            elif file_extension == ".docx":
+                # Read Word file
+                content = self._read_word_file(self.path)
+                chunks = [content[i:i + 1024 * 1024]
+                          for i in range(0, len(content), 1024 * 1024)]
+            else:
+                # Read text file
+                chunks = list(self._read_file_in_chunks(self.path))
+        instrumentation.increment("wordcount_chunks_total", len(chunks))
+        instrumentation.increment("wordcount_bytes_total", sum(len(chunk) for chunk in chunks))
 
         # Distribute work to multiprocessing pool
-        partial_results = pool.map(self._count_words_in_chunk, chunks)
+        with instrumentation.span("wordcount_count_seconds", workers=num_workers):
+            partial_results = pool.map(self._count_words_in_chunk, chunks)
 
         # Close the pool
         pool.close()
         pool.join()
 
         # Aggregate results from all processes
-        total_word_counts = Counter()
-        for partial_result in partial_results:
-            total_word_counts.update(partial_result)
+        with instrumentation.span("wordcount_merge_seconds"):
+            total_word_counts = Counter()
+            for partial_result in partial_results:
+                total_word_counts.update(partial_result)
 
         return total_word_counts
 
@@ -200,6 +215,7 @@ class WordCounter:
 
 
 if __name__ == "__main__":
+    instrumentation.main_session()
     parser = argparse.ArgumentParser(
         description="Count words in a file (text, PDF, or Word) using multiprocessing."
     )